@@ -4,49 +4,68 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 
+from mdp_modules import load_mdp_module
+
+curriculum_io = load_mdp_module("curriculum_io")
+
 log_dir = "./logs/curriculum_logs"
+history_path = os.path.join(log_dir, "curriculum_history.bin")
 gif_path = os.path.join(log_dir, "bin_confidence_evolution.gif")
 mp4_path = os.path.join(log_dir, "bin_confidence_evolution.mp4")
 
-# Configuration for the bin grid
+# Configuration for the bin grid (overridden by the history file header when present)
 max_range = 3.0
 step_size = 0.2
 interval_ms = 100
 
-# Compute the number of bins per dimension and value arrays
-num_bins = int((2 * max_range) / step_size) + 1
-lin_vals = np.linspace(-max_range, max_range, num_bins)
-ang_vals = np.linspace(-max_range, max_range, num_bins)
-
-# Mapping values to their corresponding grid indices
-lin_to_idx = {round(v, 4): i for i, v in enumerate(lin_vals)}
-ang_to_idx = {round(v, 4): i for i, v in enumerate(ang_vals)}
-
-# Load all bin confidence files and sort them by training step
-files = sorted([
-    f for f in os.listdir(log_dir) if f.startswith("bins_confidence") and f.endswith(".pkl")
-], key=lambda x: int(x.split("_step_")[1].split(".")[0]))
-
 grids = []
 steps = []
 
-# Read and store each confidence grid over time
-for f in files:
-    path = os.path.join(log_dir, f)
-    with open(path, 'rb') as pf:
-        bin_conf = pickle.load(pf)
-
-    grid = np.zeros((num_bins, num_bins))
-
-    # Fill the grid with confidence values at appropriate indices
-    for (x, z), confidence in bin_conf.items():
-        xi = lin_to_idx.get(round(x, 4))
-        zi = ang_to_idx.get(round(z, 4))
-        if xi is not None and zi is not None:
-            grid[zi, xi] = confidence
-
-    grids.append(grid)
-    steps.append(int(f.split("_step_")[1].split(".")[0]))
+if os.path.exists(history_path):
+    header, frames = curriculum_io.read_curriculum_history(history_path)
+    max_range, step_size = header["max_range"], header["steps"]
+    num_bins = header["num_lin"]
+
+    # Unlocked bins are shown at full confidence, so runs without delay are visualized as well
+    shape = (-1, header["num_lin"], header["num_ang"])
+    unlocked = curriculum_io.unpack_unlock_masks(header, frames)
+    confidence = np.maximum(frames["confidence"].reshape(shape), unlocked)
+
+    # Frames store the grid as (lin, ang); the plot has ang_vel_z on the vertical axis
+    grids = list(confidence.transpose(0, 2, 1))
+    steps = frames["step"].tolist()
+else:
+    # Legacy runs: one pickle per snapshot
+    num_bins = int((2 * max_range) / step_size) + 1
+    lin_vals = np.linspace(-max_range, max_range, num_bins)
+    ang_vals = np.linspace(-max_range, max_range, num_bins)
+
+    # Mapping values to their corresponding grid indices
+    lin_to_idx = {round(v, 4): i for i, v in enumerate(lin_vals)}
+    ang_to_idx = {round(v, 4): i for i, v in enumerate(ang_vals)}
+
+    # Load all bin confidence files and sort them by training step
+    files = sorted([
+        f for f in os.listdir(log_dir) if f.startswith("bins_confidence") and f.endswith(".pkl")
+    ], key=lambda x: int(x.split("_step_")[1].split(".")[0]))
+
+    # Read and store each confidence grid over time
+    for f in files:
+        path = os.path.join(log_dir, f)
+        with open(path, 'rb') as pf:
+            bin_conf = pickle.load(pf)
+
+        grid = np.zeros((num_bins, num_bins))
+
+        # Fill the grid with confidence values at appropriate indices
+        for (x, z), confidence in bin_conf.items():
+            xi = lin_to_idx.get(round(x, 4))
+            zi = ang_to_idx.get(round(z, 4))
+            if xi is not None and zi is not None:
+                grid[zi, xi] = confidence
+
+        grids.append(grid)
+        steps.append(int(f.split("_step_")[1].split(".")[0]))
 
 fig, ax = plt.subplots(figsize=(6, 6))
 im = ax.imshow(grids[0], cmap='Blues', origin='lower',
@@ -0,0 +1,34 @@
+import os
+import argparse
+import numpy as np
+import matplotlib.pyplot as plt
+
+parser = argparse.ArgumentParser(description="Plot the energy metrics of every curriculum command bin.")
+parser.add_argument("--input", type=str, default="./logs/energy/energy_bins.npz")
+parser.add_argument("--output", type=str, default="./logs/energy/energy_bins.png")
+args = parser.parse_args()
+
+# Saved periodically by `energy_stats` during training
+data = np.load(args.input)
+lin_vals, ang_vals = data["lin_vals"], data["ang_vals"]
+metrics = [str(m) for m in data["metrics"]]
+means = data["means"]
+
+fig, axes = plt.subplots(1, len(metrics), figsize=(6 * len(metrics), 5))
+extent = [lin_vals[0], lin_vals[-1], ang_vals[0], ang_vals[-1]]
+
+for ax, name, grid in zip(axes, metrics, np.moveaxis(means, -1, 0)):
+    # Bins are stored as (lin, ang); the plot has ang_vel_z on the vertical axis
+    masked = np.ma.masked_invalid(grid.T)
+    im = ax.imshow(masked, cmap="viridis", origin="lower", extent=extent, aspect="auto")
+    fig.colorbar(im, ax=ax)
+    ax.set_title(name)
+    ax.set_xlabel("lin_vel_x")
+    ax.set_ylabel("ang_vel_z")
+
+fig.suptitle(f"Energy per command bin, step {int(data['step'])}")
+fig.tight_layout()
+
+os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+fig.savefig(args.output, dpi=150)
+print(f"Heatmaps saved to: {args.output}")
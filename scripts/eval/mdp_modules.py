@@ -0,0 +1,35 @@
+"""
+Loads the Isaac-free modules of the CFLAnymalC `mdp` package for the evaluation scripts.
+
+Importing them through the package would run its `__init__`, which pulls in the Isaac Sim
+runtime. Loading them by file path skips it, so the scripts share the training code for
+file formats and curriculum updates instead of keeping their own copies.
+"""
+
+import importlib.util
+import os
+import sys
+
+MDP_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..", "..", "source", "CFLAnymalC", "CFLAnymalC", "tasks", "manager_based", "cflanymalc", "mdp",
+)
+
+
+def load_mdp_module(name):
+    """
+    Loads `mdp/<name>.py` by file path, once per process.
+
+    Args:
+        name: Module file name without extension, e.g. "curriculum_io".
+
+    Returns:
+        The loaded module.
+    """
+    module_name = f"cflanymalc_mdp_{name}"
+    if module_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(MDP_DIR, f"{name}.py"))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[module_name]
@@ -0,0 +1,223 @@
+"""
+Replays a recorded curriculum error stream through many grid curriculum configurations.
+
+Training with `command_levels(record_errors=True)` writes every command and tracking error
+seen by the curriculum to `logs/curriculum_logs/curriculum_errors.bin`. This script feeds
+that stream to a sweep of (steps, eps_v, eps_w, window_size, delay) settings on the CPU and
+reports how fast each one unlocks the grid.
+
+Configurations sharing (steps, window_size, delay) bin the stream identically and share
+their error windows, so they run as one batch with a leading config dimension and only
+their thresholds differ. The replay follows the dense mode of `GridCurriculumManager`,
+including re-locking and adaptive thresholds, and assumes the recorded errors do not depend
+on the settings. The stream reader, error window write, unlock decision, thresholds and
+bound extraction are the training code itself, loaded from `curriculum_io` and `grid_ops`
+(see `mdp_modules`).
+"""
+
+import argparse
+import itertools
+import json
+import os
+
+import numpy as np
+import torch
+
+from mdp_modules import load_mdp_module
+
+curriculum_io = load_mdp_module("curriculum_io")
+grid_ops = load_mdp_module("grid_ops")
+
+parser = argparse.ArgumentParser(description="Replay a curriculum error stream through a sweep of settings.")
+parser.add_argument("--stream", type=str, default="./logs/curriculum_logs/curriculum_errors.bin")
+parser.add_argument("--output", type=str, default="./logs/curriculum_logs/replay_sweep.json")
+parser.add_argument("--steps", type=float, nargs="+", default=[0.5])
+parser.add_argument("--eps_v", type=float, nargs="+", default=[0.15])
+parser.add_argument("--eps_w", type=float, nargs="+", default=[0.25])
+parser.add_argument("--window_size", type=int, nargs="+", default=[2])
+parser.add_argument("--delay", type=int, nargs="+", default=[0], help="0 for window mode, 1 for confidence delay.")
+parser.add_argument("--relock_factor", type=float, default=None, help="Re-lock hysteresis factor, unset never re-locks.")
+parser.add_argument("--confidence_decay", type=float, default=0.5)
+parser.add_argument("--max_confidence", type=float, default=2.0)
+parser.add_argument("--adaptive_eps", action="store_true", default=False, help="Scale thresholds with the bin magnitude.")
+parser.add_argument("--eps_magnitude_scale", type=float, default=0.5)
+parser.add_argument("--log_error_decay", action="store_true", default=False, help="Decay adaptive thresholds per bin.")
+parser.add_argument("--eps_decay_samples", type=float, default=100.0)
+parser.add_argument("--max_range", type=float, default=3.0)
+parser.add_argument("--start_range", type=float, default=0.5)
+parser.add_argument("--report_every", type=int, default=100, help="Curriculum calls between two trajectory points.")
+
+
+def load_error_stream(path):
+    """
+    Reads the error stream written during training into flat arrays.
+
+    Returns:
+        Tuple of the step of every call (C,), all samples concatenated (S, 4) and the
+        sample offset of every call (C + 1,).
+    """
+    _, calls = curriculum_io.read_error_stream(path)
+    steps = np.array([step for step, _ in calls])
+    offsets = np.concatenate([[0], np.cumsum([len(samples) for _, samples in calls])]).tolist()
+    samples = np.concatenate([samples for _, samples in calls]) if calls else np.zeros((0, 4), dtype=np.float32)
+    return steps, torch.from_numpy(samples), offsets
+
+
+class BatchedGridReplay:
+    """
+
+    Dense grid curriculum over a batch of configurations sharing one grid and window size.
+
+    Attributes:
+        eps: [eps_v, eps_w] base threshold of each configuration (C, 2).
+        unlock_mask: Unlock state of each configuration (C, num_lin, num_ang).
+        confidence: Bin confidences of each configuration, used in delay mode.
+        bin_samples: Number of samples ever recorded per bin, used by adaptive thresholds.
+
+    """
+
+    def __init__(self, steps, max_range, start_range, window_size, delay, eps, args):
+        self.steps = steps
+        self.max_range = max_range
+        self.start_range = start_range
+        self.window_size = window_size
+        self.delay = delay
+        self.eps = torch.as_tensor(eps, dtype=torch.float32)
+        self.relock_factor = args.relock_factor
+        self.confidence_decay = args.confidence_decay
+        self.max_confidence = args.max_confidence
+        self.adaptive_eps = args.adaptive_eps
+        self.log_error_decay = args.log_error_decay
+        self.eps_decay_samples = args.eps_decay_samples
+
+        # Same grid as `GridCurriculumManager._build_command_grid`
+        self.vals = torch.tensor([round(v, 4) for v in np.arange(-max_range, max_range + steps, steps)])
+        self.num_vals = len(self.vals)
+        self.num_bins = self.num_vals ** 2
+        self.start_bounds = torch.tensor([-start_range, start_range, -start_range, start_range])
+
+        num_configs = len(self.eps)
+        self.grid_shape = (num_configs, self.num_vals, self.num_vals)
+        self.unlock_mask = torch.zeros(self.grid_shape, dtype=torch.bool)
+        self.confidence = torch.zeros(self.grid_shape)
+        self.win_errors = torch.zeros(self.num_bins + 1, window_size, 2)
+        self.win_counts = torch.zeros(self.num_bins, dtype=torch.long)
+
+        if self.adaptive_eps:
+            grid_lin, grid_ang = torch.meshgrid(self.vals, self.vals, indexing="ij")
+            cmd_map = torch.stack([grid_lin.reshape(-1), grid_ang.reshape(-1)], dim=1)
+            self.eps_scale = 1.0 + args.eps_magnitude_scale * cmd_map.abs()
+            self.bin_samples = torch.zeros(self.num_bins)
+
+    def thresholds(self, counts):
+        """
+        Returns the eps_v and eps_w thresholds of every configuration, broadcastable to the grid.
+
+        Args:
+            counts: Number of samples per bin in this call (num_bins,).
+        """
+        if not self.adaptive_eps:
+            return self.eps[:, 0, None, None], self.eps[:, 1, None, None]
+        self.bin_samples += counts
+        eps_bins = grid_ops.bin_thresholds(
+            self.eps[:, None, :], self.eps_scale, self.bin_samples, self.log_error_decay, self.eps_decay_samples
+        )
+        return eps_bins[..., 0].view(self.grid_shape), eps_bins[..., 1].view(self.grid_shape)
+
+    def step(self, samples):
+        """
+        Applies one recorded curriculum call to every configuration.
+
+        Args:
+            samples: [cmd_lin_vel_x, cmd_ang_vel_z, v_error, w_error] per env (E, 4).
+        """
+        idx = torch.round((samples[:, :2] - self.vals[0]) / self.steps).long().clamp_(0, self.num_vals - 1)
+        bin_idx = idx[:, 0] * self.num_vals + idx[:, 1]
+        errors = samples[:, 2:]
+        counts = torch.bincount(bin_idx, minlength=self.num_bins)
+
+        if self.delay:
+            sums = torch.zeros(self.num_bins, 2).index_add_(0, bin_idx, errors)
+            avg = sums / counts.clamp(min=1)[:, None]
+            measured = counts > 0
+        else:
+            grid_ops.ring_write(self.win_errors, self.win_counts, bin_idx, counts, errors)
+            avg = self.win_errors[:self.num_bins].mean(dim=1)
+            measured = (counts > 0) & (self.win_counts >= self.window_size)
+
+        # Bin statistics are shared, only the thresholds and the curriculum state are per config
+        bin_shape = (1, self.num_vals, self.num_vals)
+        eps_v, eps_w = self.thresholds(counts)
+        grid_ops.apply_unlock_decision(
+            self.unlock_mask,
+            self.confidence,
+            measured.view(bin_shape),
+            avg[:, 0].view(bin_shape),
+            avg[:, 1].view(bin_shape),
+            eps_v,
+            eps_w,
+            delay=self.delay,
+            max_confidence=self.max_confidence,
+            relock_factor=self.relock_factor,
+            confidence_decay=self.confidence_decay,
+        )
+
+    def summary(self):
+        """
+        Returns the unlocked bin count (C,) and [lin_min, lin_max, ang_min, ang_max] (C, 4).
+        """
+        bounds = grid_ops.bound_values(self.unlock_mask, self.vals, self.vals, self.start_bounds)
+        return self.unlock_mask.flatten(1).sum(dim=1), bounds
+
+
+def main():
+    args = parser.parse_args()
+    call_steps, samples, offsets = load_error_stream(args.stream)
+    print(f"Loaded {len(call_steps)} curriculum calls, {len(samples)} samples from {args.stream}")
+
+    results = []
+    for steps, window_size, delay in itertools.product(args.steps, args.window_size, args.delay):
+        eps = list(itertools.product(args.eps_v, args.eps_w))
+        replay = BatchedGridReplay(steps, args.max_range, args.start_range, window_size, bool(delay), eps, args)
+
+        trajectory = []
+        for i in range(len(call_steps)):
+            replay.step(samples[offsets[i]:offsets[i + 1]])
+            if (i + 1) % args.report_every == 0 or i == len(call_steps) - 1:
+                counts, bounds = replay.summary()
+                trajectory.append((int(call_steps[i]), counts.tolist(), bounds.tolist()))
+
+        for c, (eps_v, eps_w) in enumerate(eps):
+            unlocked = [point[1][c] for point in trajectory]
+            coverage = [n / replay.num_bins for n in unlocked]
+            results.append({
+                "steps": steps,
+                "eps_v": eps_v,
+                "eps_w": eps_w,
+                "window_size": window_size,
+                "delay": bool(delay),
+                "num_bins": replay.num_bins,
+                "step_to_50": next((p[0] for p, f in zip(trajectory, coverage) if f >= 0.5), None),
+                "step_to_90": next((p[0] for p, f in zip(trajectory, coverage) if f >= 0.9), None),
+                "trajectory": [
+                    {"step": p[0], "unlocked_bins": p[1][c], "bounds": p[2][c]} for p in trajectory
+                ],
+            })
+
+    print(f"{'steps':>6} {'eps_v':>6} {'eps_w':>6} {'window':>6} {'delay':>6} {'unlocked':>10} {'to 50%':>10} {'to 90%':>10}")
+    for r in results:
+        final = r["trajectory"][-1]["unlocked_bins"] if r["trajectory"] else 0
+        unlocked = f"{final}/{r['num_bins']}"
+        print(
+            f"{r['steps']:>6} {r['eps_v']:>6} {r['eps_w']:>6} {r['window_size']:>6} {str(r['delay']):>6} "
+            f"{unlocked:>10} {str(r['step_to_50']):>10} {str(r['step_to_90']):>10}"
+        )
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Sweep results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
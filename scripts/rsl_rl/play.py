@@ -8,7 +8,6 @@
 """Launch Isaac Sim Simulator first."""
 
 import argparse
-import collections
 from itertools import product
 import math
 
@@ -183,137 +182,98 @@ def main():
     )
 
     dt = env.unwrapped.step_dt
-    obs, _ = env.get_observations()
 
     # Evalaluation configuration
     trials, trial_steps, warmup_steps = 5, 900, 50
     results = []
-    buffer = []
 
     # Evaluation for each pair
     v_x_vals = np.linspace(-4, 4, 30)  # Antes
     omega_z_vals = np.linspace(-4, 4, 30)  # Antes
 
-    combinations = list(product(v_x_vals, omega_z_vals))
-    chunks = np.array_split(combinations, args_cli.num_envs)
-    env_command_queues = {i: list(chunk) for i, chunk in enumerate(chunks)}
-    max_steps = max(len(queue) for queue in env_command_queues.values())
+    if args_cli.unique: combinations = [(3.0, 0.0)]
+    else: combinations = list(product(v_x_vals, omega_z_vals))
+
+    grid_commands = [[float(v_x_cmd), 0.0, float(omega_z_cmd)] for v_x_cmd, omega_z_cmd in combinations]
+    # --num_envs may be unset, in which case the task config decides
+    num_envs = env.unwrapped.num_envs
+    scheduler = rsl_rl_utils.CommandGridScheduler(
+        grid_commands, num_envs, trials, trial_steps, warmup_steps, env.unwrapped.device
+    )
+    num_windows = math.ceil(scheduler.num_items / num_envs)
+    print(f"[INFO] Evaluating {len(grid_commands)} commands x {trials} trials on {num_envs} envs "
+          f"(~{num_windows} windows of {trial_steps} steps)")
 
     total_start_time = time.time()
 
-    for step_index in range(max_steps):
-        commands = []
-        for i in range(args_cli.num_envs):
-            if step_index < len(env_command_queues[i]):
-                v_x_cmd, omega_z_cmd = env_command_queues[i][step_index]
-            else:
-                v_x_cmd, omega_z_cmd = 0.0, 0.0
-
-            if args_cli.unique: commands.append([3.0, 0.0, 0.0])
-            else: commands.append([v_x_cmd, 0.0, omega_z_cmd])
-
-        command_tensor = torch.tensor(commands, device=env.device)
-
-        print(f"\n[INFO] Evaluating step {step_index + 1}/{len(env_command_queues[0])}")
-        for i, cmd in enumerate(commands):
-            print(f"  Env {i}: v_x={cmd[0]:.2f}, omega_z={cmd[2]:.2f}")
-
-        for trial in range(trials):
-            buffer = []
-            print(f"[INFO]  Trial {trial + 1}/{trials}")
-            obs, _ = env.get_observations()
-            timestep = 0
-
-            while timestep < trial_steps and simulation_app.is_running():
-                start_time = time.time()
-                with torch.inference_mode():
-                    if trial == 0 and timestep == 0: env.reset()
-
-                    if not args_cli.keyboard:
-                        command_term = env.env.unwrapped.command_manager.get_term("base_velocity")
-                        command_term.update_commands(command_tensor)
-
-                    actions = policy(obs.float())
-                    obs, _, _, _ = env.step(actions)
-
-                    for i in range(args_cli.num_envs):
-
-                        v_x = obs[i, 0].item()
-                        omega_z = obs[i, 5].item()
-
-                        target_v_x = obs[i, 9].item()
-                        target_omega_z = obs[i, 11].item()
-
-                        error_x = (v_x - target_v_x) ** 2
-                        error_omega_z = (omega_z - target_omega_z) ** 2
-
-                        if timestep >= warmup_steps:
-                            buffer.append({
-                                "env": i,
-                                "v_x_cmd": v_x,
-                                "omega_z_cmd": omega_z,
-                                "error_x": error_x,
-                                "error_omega_z": error_omega_z,
-                            })
-
-                    timestep += 1
-                    if timestep == trial_steps:
-                        obs, _ = env.reset()
-
-                    # Delay for real-time execution (optional)
-                    sleep_time = dt - (time.time() - start_time)
-                    if args_cli.real_time and sleep_time > 0:
-                        time.sleep(sleep_time)
-
-                    if args_cli.keyboard:
-                        rsl_rl_utils.camera_follow(env)
-                        current_cmd = controller.advance()
-                        print(f"[DEBUG] Teclado: v_x={current_cmd[0]:.2f}, omega_z={current_cmd[2]:.2f}")
-
-            results_per_env = collections.defaultdict(lambda: {
-                "sum_error_x": 0.0,
-                "sum_error_omega_z": 0.0,
-                "count": 0
-            })
-
-            for entry in buffer:
-                env_idx = entry["env"]
-                results_per_env[env_idx]["sum_error_x"]        += entry["error_x"]
-                results_per_env[env_idx]["sum_error_omega_z"] += entry["error_omega_z"]
-                results_per_env[env_idx]["count"]             += 1
-
-            if args_cli.video:
-                timestep += 1
-                if timestep == args_cli.video_length:
-                    break
-
-        for env_id, data in results_per_env.items():             
-            count              = data["count"]
-            avg_error_x        = data["sum_error_x"]        / count
-            avg_error_omega_z  = data["sum_error_omega_z"]  / count
-            mse_x              = data["sum_error_x"] / count
-            mse_omega_z        = data["sum_error_omega_z"] / count
-
-            rmse_x             = mse_x ** 0.5
-            rmse_omega_z       = mse_omega_z ** 0.5
-
-            v_x_cmd, _, omega_z_cmd = commands[env_id]   
-
-            print(f"[RESULT][ENV {env_id}] => v_x={v_x_cmd:.2f}, "
-                f"omega_z={omega_z_cmd:.2f} | "
-                f"error_x={avg_error_x:.4f}, "
-                f"error_omega_z={avg_error_omega_z:.4f}, "
-                f"count={count}")
-
-            results.append({                                      
-                "v_x_cmd": v_x_cmd,
-                "omega_z_cmd": omega_z_cmd,
-                "avg_error_x": avg_error_x,
-                "avg_error_omega_z": avg_error_omega_z,
-                "rmse_x": rmse_x,
-                "rmse_omega_z": rmse_omega_z,
-                "count": count
-            })
+    with torch.inference_mode():
+        env.reset()
+        env_ids, commands = scheduler.assign(np.arange(num_envs))
+        command_term = env.unwrapped.command_manager.get_term("base_velocity")
+        if not args_cli.keyboard:
+            command_term.update_commands_for_ids(env_ids, commands)
+        obs, _ = env.get_observations()
+    timestep = 0
+
+    while not scheduler.done and simulation_app.is_running():
+        start_time = time.time()
+        with torch.inference_mode():
+            actions = policy(obs.float())
+            obs, _, _, _ = env.step(actions)
+
+            # [v_x, omega_z] against [target_v_x, target_omega_z]
+            finished = scheduler.record((obs[:, [0, 5]] - obs[:, [9, 11]]) ** 2)
+
+            if len(finished) > 0:
+                env_ids, commands = scheduler.assign(finished)
+                if not args_cli.keyboard:
+                    command_term.update_commands_for_ids(env_ids, commands)
+                    # Time out the reassigned envs so they reset inside the next step
+                    env.unwrapped.episode_length_buf[env_ids] = env.unwrapped.max_episode_length
+                print(f"[INFO] Completed {scheduler.completed}/{scheduler.num_items} windows")
+
+            # Delay for real-time execution (optional)
+            sleep_time = dt - (time.time() - start_time)
+            if args_cli.real_time and sleep_time > 0:
+                time.sleep(sleep_time)
+
+            if args_cli.keyboard:
+                rsl_rl_utils.camera_follow(env)
+                current_cmd = controller.advance()
+                print(f"[DEBUG] Teclado: v_x={current_cmd[0]:.2f}, omega_z={current_cmd[2]:.2f}")
+
+        if args_cli.video:
+            timestep += 1
+            if timestep == args_cli.video_length:
+                break
+
+    # Single host transfer for the whole sweep
+    for (v_x_cmd, _, omega_z_cmd), (sum_error_x, sum_error_omega_z), count in zip(
+        grid_commands, scheduler.sum_sq_errors.tolist(), scheduler.counts.tolist()
+    ):
+        if count == 0:
+            continue
+        count = int(count)
+        avg_error_x        = sum_error_x        / count
+        avg_error_omega_z  = sum_error_omega_z  / count
+        rmse_x             = avg_error_x ** 0.5
+        rmse_omega_z       = avg_error_omega_z ** 0.5
+
+        print(f"[RESULT] => v_x={v_x_cmd:.2f}, "
+            f"omega_z={omega_z_cmd:.2f} | "
+            f"error_x={avg_error_x:.4f}, "
+            f"error_omega_z={avg_error_omega_z:.4f}, "
+            f"count={count}")
+
+        results.append({
+            "v_x_cmd": v_x_cmd,
+            "omega_z_cmd": omega_z_cmd,
+            "avg_error_x": avg_error_x,
+            "avg_error_omega_z": avg_error_omega_z,
+            "rmse_x": rmse_x,
+            "rmse_omega_z": rmse_omega_z,
+            "count": count
+        })
 
     results.sort(key=lambda x: (x["v_x_cmd"], x["omega_z_cmd"]))
 
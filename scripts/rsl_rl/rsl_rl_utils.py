@@ -1,6 +1,7 @@
 # Copyright (c) 2024-2025 Ziqi Fan
 # SPDX-License-Identifier: Apache-2.0
 
+import numpy as np
 import torch
 
 import isaaclab.utils.math as math_utils
@@ -58,3 +59,194 @@ def camera_follow(env):
         eye=smooth_camera_pos.cpu().numpy(), 
         lookat=robot_pos.cpu().numpy()
     )
+
+
+def attach_curriculum_logger(runner):
+    """
+    Writes the grid curriculum metrics to the runner's logger at each logging step.
+
+    The curriculum hook keeps its statistics on device when `device_metrics` is enabled,
+    so they are only copied to the host here, once per training iteration.
+
+    Args:
+        runner: The RSL-RL runner whose `log` method is wrapped.
+    """
+    from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.curriculum import curriculum_log_metrics
+
+    runner_log = runner.log
+
+    def log(locs, *args, **kwargs):
+        runner_log(locs, *args, **kwargs)
+        for key, value in curriculum_log_metrics().items():
+            runner.writer.add_scalar(f"Curriculum/command_ranges/{key}", value, locs["it"])
+
+    runner.log = log
+
+
+def attach_curriculum_checkpointing(runner):
+    """
+    Stores the grid curriculum state in every checkpoint saved by the runner.
+
+    The state is written into the checkpoint's `infos` entry, so `runner.load` returns it
+    and `restore_curriculum_state` can continue the curriculum on resume.
+
+    Args:
+        runner: The RSL-RL runner whose `save` method is wrapped.
+    """
+    from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.curriculum import curriculum_state_dict
+
+    runner_save = runner.save
+
+    def save(path, infos=None):
+        state = curriculum_state_dict()
+        if state is not None:
+            infos = {**(infos or {}), "curriculum": state}
+        runner_save(path, infos)
+
+    runner.save = save
+
+
+def attach_curriculum_sync(runner):
+    """
+    Synchronizes the distributed grid curriculum once per training iteration.
+
+    Curriculum calls only happen on env steps with resets, whose timing differs across
+    ranks, so they cannot issue collectives themselves. The reduction runs instead right
+    before the runner's algorithm update, which every rank reaches once per iteration in
+    the same order relative to the gradient all-reduces.
+
+    Args:
+        runner: The RSL-RL runner whose algorithm `update` method is wrapped.
+    """
+    from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.curriculum import curriculum_sync
+
+    alg_update = runner.alg.update
+    iteration = 0
+
+    def update(*args, **kwargs):
+        nonlocal iteration
+        # Same mode as the env step that accumulated the statistics
+        with torch.inference_mode():
+            curriculum_sync(iteration)
+        iteration += 1
+        return alg_update(*args, **kwargs)
+
+    runner.alg.update = update
+
+
+def restore_curriculum_state(infos):
+    """
+    Restores the grid curriculum state from the `infos` returned by `runner.load`.
+
+    Args:
+        infos: Checkpoint infos, possibly None for checkpoints saved without a curriculum.
+    """
+    from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.curriculum import load_curriculum_state_dict
+
+    if infos and "curriculum" in infos:
+        load_curriculum_state_dict(infos["curriculum"])
+        print("[INFO]: Restored curriculum state from checkpoint.")
+
+
+class CommandGridScheduler:
+    """
+    Packs (command, trial) evaluation windows into env slots.
+
+    Every command of the grid is evaluated `trials` times, and a work item is one window of
+    `trial_steps` steps of one env tracking one command. An env is handed the next item as
+    soon as its window ends, so the trials of a command run side by side on different envs
+    instead of one after the other, and envs only run without work at the end of the sweep.
+
+    Window progress is deterministic, so it is tracked on the host without synchronizing,
+    while tracking errors are accumulated on device.
+
+    Attributes:
+        commands: Evaluated [v_x, v_y, omega_z] commands (K, 3).
+        slot_items: Work item of each env, -1 when the env has no work (E,).
+        slot_steps: Steps taken by each env in its current window (E,).
+        sum_sq_errors: Sum of squared [v_x, omega_z] errors of each command (K, 2).
+        counts: Number of post-warmup samples of each command (K,).
+        completed: Number of finished work items.
+    """
+
+    def __init__(self, commands, num_envs, trials, trial_steps, warmup_steps, device):
+        self.commands = torch.as_tensor(commands, dtype=torch.float32, device=device)
+        self.num_commands = len(self.commands)
+        self.num_items = self.num_commands * trials
+        self.trial_steps = trial_steps
+        self.warmup_steps = warmup_steps
+        self.device = device
+        self.next_item = 0
+        self.completed = 0
+
+        self.slot_items = np.full(num_envs, -1, dtype=np.int64)
+        self.slot_steps = np.zeros(num_envs, dtype=np.int64)
+        self.sum_sq_errors = torch.zeros((self.num_commands, 2), device=device)
+        self.counts = torch.zeros(self.num_commands, device=device)
+
+        # Device mirror of the slot state, used to mask samples without host transfers
+        self._active = torch.zeros(num_envs, dtype=torch.bool, device=device)
+        self._steps = torch.zeros(num_envs, dtype=torch.long, device=device)
+        self._slot_sums = torch.zeros((num_envs, 2), device=device)
+        self._slot_counts = torch.zeros(num_envs, device=device)
+
+    @property
+    def done(self):
+        return self.next_item >= self.num_items and (self.slot_items < 0).all()
+
+    def assign(self, env_ids):
+        """
+        Hands the next work items to the given envs and restarts their windows.
+
+        Items are numbered trial-major, so consecutive items belong to different commands.
+
+        Args:
+            env_ids: Envs to assign (N,), as a host integer array.
+
+        Returns:
+            Tuple of the env ids (N,) and their new commands (N, 3) on device, zero for
+            envs left without work.
+        """
+        num_assigned = min(len(env_ids), self.num_items - self.next_item)
+        items = np.full(len(env_ids), -1, dtype=np.int64)
+        items[:num_assigned] = np.arange(self.next_item, self.next_item + num_assigned)
+        self.next_item += num_assigned
+
+        self.slot_items[env_ids] = items
+        self.slot_steps[env_ids] = 0
+
+        ids = torch.as_tensor(env_ids, dtype=torch.long, device=self.device)
+        items = torch.as_tensor(items, device=self.device)
+        self._active[ids] = items >= 0
+        self._steps[ids] = 0
+        self._slot_sums[ids] = 0.0
+        self._slot_counts[ids] = 0.0
+
+        commands = torch.zeros((len(env_ids), 3), device=self.device)
+        commands[items >= 0] = self.commands[items[items >= 0] % self.num_commands]
+        return ids, commands
+
+    def record(self, sq_errors):
+        """
+        Accumulates one step of squared tracking errors and closes the finished windows.
+
+        Args:
+            sq_errors: Squared [v_x, omega_z] error of each env (E, 2).
+
+        Returns:
+            Host array of the envs whose window ended at this step.
+        """
+        recording = self._active & (self._steps >= self.warmup_steps)
+        self._slot_sums += sq_errors * recording[:, None]
+        self._slot_counts += recording
+        self._steps += 1
+        self.slot_steps += 1
+
+        finished = np.flatnonzero((self.slot_items >= 0) & (self.slot_steps >= self.trial_steps))
+        if len(finished) > 0:
+            ids = torch.as_tensor(finished, device=self.device)
+            cmd_ids = torch.as_tensor(self.slot_items[finished] % self.num_commands, device=self.device)
+            self.sum_sq_errors.index_add_(0, cmd_ids, self._slot_sums[ids])
+            self.counts.index_add_(0, cmd_ids, self._slot_counts[ids])
+            self.completed += len(finished)
+        return finished
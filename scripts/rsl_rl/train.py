@@ -96,6 +96,7 @@ torch.backends.cudnn.deterministic = False
 torch.backends.cudnn.benchmark = False
 
 import CFLAnymalC.tasks  # noqa: F401
+import rsl_rl_utils
 from terrain_utils import apply_overrides_train
 
 @hydra_task_config(args_cli.task, "rsl_rl_cfg_entry_point")
@@ -179,11 +180,18 @@ def main(env_cfg: ManagerBasedRLEnvCfg | DirectRLEnvCfg | DirectMARLEnvCfg, agen
     runner = OnPolicyRunner(env, agent_cfg.to_dict(), log_dir=log_dir, device=agent_cfg.device)
     # write git state to logs
     runner.add_git_repo_to_log(__file__)
+    # log device-side curriculum metrics at the runner's logging step
+    rsl_rl_utils.attach_curriculum_logger(runner)
+    # save the curriculum state with every checkpoint
+    rsl_rl_utils.attach_curriculum_checkpointing(runner)
+    # reduce the curriculum statistics across ranks at iteration boundaries
+    rsl_rl_utils.attach_curriculum_sync(runner)
     # load the checkpoint
     if agent_cfg.resume or agent_cfg.algorithm.class_name == "Distillation":
         print(f"[INFO]: Loading model checkpoint from: {resume_path}")
-        # load previously trained model
-        runner.load(resume_path)
+        # load previously trained model and continue its curriculum
+        infos = runner.load(resume_path)
+        rsl_rl_utils.restore_curriculum_state(infos)
 
     # dump the configuration into log-directory
     dump_yaml(os.path.join(log_dir, "params", "env.yaml"), env_cfg)
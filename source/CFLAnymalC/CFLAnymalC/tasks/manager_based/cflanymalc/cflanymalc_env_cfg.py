@@ -58,6 +58,10 @@ class AnymalCFlatEnvCfg(AnymalCDefaultEnvCfg):
         self.scene.terrain.terrain_type = "plane"
         self.scene.terrain.terrain_generator = None
 
+        # per-terrain statistics need a terrain generator
+        self.events.terrain_perf = None
+        self.events.energy_perf = None
+
 
 @configclass
 class AnymalCRoughEnvCfg(AnymalCDefaultEnvCfg):
@@ -109,6 +113,7 @@ class AnymalCPlayRoughEnvCfg(AnymalCRoughEnvCfg):
         self.terminations.terrain_out_of_bounds = None
 
         self.events.terrain_perf = None
+        self.events.energy_perf = None
         self.events.base_external_force_torque = None
         self.events.push_robot = None
         self.events.physics_material = EventTerm(
@@ -3,13 +3,86 @@ import torch
 from isaaclab.utils import configclass
 import isaaclab_tasks.manager_based.locomotion.velocity.mdp as mdp
 from isaaclab.managers.command_manager import CommandTerm, CommandTermCfg
-from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.curriculum import grid_curriculum
+from CFLAnymalC.tasks.manager_based.cflanymalc.mdp import curriculum
+from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.curriculum import curriculum_groups
+
+class CurriculumVelocityCommand(mdp.UniformVelocityCommand):
+    """
+
+    Uniform velocity command whose ranges follow the grid curriculum of each env's group.
+
+    With a single curriculum group this behaves exactly like `UniformVelocityCommand`, as the
+    curriculum writes its ranges into the config. With per-terrain groups, lin_vel_x and
+    ang_vel_z are resampled from the unlocked range of the env's terrain, and the heading
+    controller output is clipped to the same range.
+
+    The curriculum bin of each command is cached when it is resampled, so the curriculum
+    does not re-map every command on each reset. Only the ang_vel_z column of heading envs
+    is refreshed on read, since the heading controller changes it every step.
+
+    """
+
+    def __init__(self, cfg: "CurriculumVelocityCommandCfg", env):
+        super().__init__(cfg, env)
+        self.bin_lin_idx = torch.zeros(self.num_envs, dtype=torch.long, device=self.device)
+        self.bin_ang_idx = torch.zeros(self.num_envs, dtype=torch.long, device=self.device)
+
+    def refresh_bin_indices(self, env_ids=slice(None)):
+        """Caches the curriculum bin of the current commands, standing envs mapping to zero."""
+        manager = curriculum.grid_curriculum
+        if manager is None:
+            return
+        cmds = self.vel_command_b[env_ids] * ~self.is_standing_env[env_ids, None]
+        self.bin_lin_idx[env_ids] = manager.lin_indices(cmds[:, 0])
+        self.bin_ang_idx[env_ids] = manager.ang_indices(cmds[:, 2])
+
+    def bin_indices(self, env_ids) -> torch.Tensor:
+        """Returns the flat curriculum bin index of the given envs' commands (E,)."""
+        manager = curriculum.grid_curriculum
+        ang_idx = self.bin_ang_idx[env_ids]
+        if self.cfg.heading_command:
+            heading = self.is_heading_env[env_ids] & ~self.is_standing_env[env_ids]
+            ang_idx = torch.where(heading, manager.ang_indices(self.vel_command_b[env_ids, 2]), ang_idx)
+        return self.bin_lin_idx[env_ids] * manager.num_ang + ang_idx
+
+    def _group_bounds(self, env_ids) -> torch.Tensor | None:
+        manager = curriculum.grid_curriculum
+        if manager is None or manager.num_groups == 1:
+            return None
+        return manager.env_range_bounds(curriculum_groups(self._env, env_ids))
+
+    def _resample_command(self, env_ids):
+        super()._resample_command(env_ids)
+        bounds = self._group_bounds(env_ids)
+        if bounds is not None:
+            r = torch.rand(len(env_ids), 2, device=self.device)
+            self.vel_command_b[env_ids, 0] = bounds[:, 0] + r[:, 0] * (bounds[:, 1] - bounds[:, 0])
+            self.vel_command_b[env_ids, 2] = bounds[:, 2] + r[:, 1] * (bounds[:, 3] - bounds[:, 2])
+        self.refresh_bin_indices(env_ids)
+
+    def _update_command(self):
+        super()._update_command()
+        if not self.cfg.heading_command:
+            return
+        bounds = self._group_bounds(slice(None))
+        if bounds is None:
+            return
+        clipped = torch.clip(self.vel_command_b[:, 2], min=bounds[:, 2], max=bounds[:, 3])
+        heading = self.is_heading_env & ~self.is_standing_env
+        self.vel_command_b[:, 2] = torch.where(heading, clipped, self.vel_command_b[:, 2])
+
+
+@configclass
+class CurriculumVelocityCommandCfg(mdp.UniformVelocityCommandCfg):
+    """Configuration for the curriculum velocity command."""
+    class_type: type = CurriculumVelocityCommand
+
 
 @configclass
 class CommandsCfg:
     """Command specifications for the MDP."""
 
-    base_velocity = mdp.UniformVelocityCommandCfg(
+    base_velocity = CurriculumVelocityCommandCfg(
         asset_name="robot",
         resampling_time_range=(10.0, 10.0),
         rel_standing_envs=0.02,
@@ -27,26 +100,35 @@ class ActionsCfg:
     """Action specifications for the MDP."""
     joint_pos = mdp.JointPositionActionCfg(asset_name="robot", joint_names=[".*"], scale=0.5, use_default_offset=True)
 
-class PrioritizedVelocityCommand(CommandTerm):
-    def __init__(self, cfg: "PrioritizedVelocityCommandCfg", env):
-        super().__init__(cfg, env)
-        self.curr = grid_curriculum 
+class PrioritizedVelocityCommand(CurriculumVelocityCommand):
+    """
 
-    def __call__(self, env, env_ids):
-        idx = self.curr.sample_cmd_indices(len(env_ids))
-        cmds = self.curr.cmd_map[idx]
-        return cmds
+    Velocity command that samples lin_vel_x and ang_vel_z from the unlocked curriculum bins,
+    weighted by their learning progress.
+
+    All resampled envs are drawn in one batched `torch.multinomial` call on device, then
+    jittered uniformly within their bin. Requires `command_levels` with `prioritized=True`;
+    until the curriculum exists, commands fall back to the uniform ranges. For heading envs
+    the sampled ang_vel_z is replaced by the heading controller output, as in the base class.
+
+    """
+
+    def _resample_command(self, env_ids):
+        super()._resample_command(env_ids)
+        manager = curriculum.grid_curriculum
+        if manager is None:
+            return
+        group_idx = curriculum_groups(self._env, env_ids) if manager.num_groups > 1 else None
+        cmds, _ = manager.sample_commands(len(env_ids), group_idx)
+        self.vel_command_b[env_ids, 0] = cmds[:, 0]
+        self.vel_command_b[env_ids, 2] = cmds[:, 1]
+        self.refresh_bin_indices(env_ids)
 
-    def reset(self, env_ids): return {}
-    def _resample_command(self, env_ids): pass
-    def _update_command(self): pass
-    def _update_metrics(self): pass
 
 @configclass
-class PrioritizedVelocityCommandCfg(CommandTermCfg):
-    class_type = PrioritizedVelocityCommand
-    asset_name: str = "robot"
-    resampling_time_range: tuple[float, float] = (10.0, 10.0)
+class PrioritizedVelocityCommandCfg(CurriculumVelocityCommandCfg):
+    """Configuration for the prioritized velocity command."""
+    class_type: type = PrioritizedVelocityCommand
 
 
 class FixedVelocityCommand(CommandTerm):
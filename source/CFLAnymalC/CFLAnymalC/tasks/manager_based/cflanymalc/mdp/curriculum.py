@@ -1,5 +1,5 @@
 from isaaclab.utils import configclass
-from typing import List, Tuple, Set
+from typing import List, Tuple, Set, Union
 from dataclasses import field
 from isaaclab.managers import CurriculumTermCfg as CurrTerm
 import torch
@@ -12,14 +12,44 @@ from collections import Counter
 from collections import defaultdict, deque
 
 from isaaclab.envs import ManagerBasedRLEnv
+from isaaclab.utils.math import wrap_to_pi
+
+from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.curriculum_io import (
+    CurriculumHistoryWriter,
+    ErrorStreamWriter,
+    load_curriculum_snapshot,
+    save_curriculum_snapshot,
+)
+from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.curriculum_sparse import SparseGridCurriculumManager
+from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.grid_ops import (
+    accumulate_confidence,
+    apply_unlock_decision,
+    bin_thresholds,
+    bound_values,
+    dilate_mask,
+    mask_bound_indices,
+    ring_write,
+)
+from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.terrain import env_terrain_ids
 
 # Variables for managing curriculum logging and persistence
 curriculum_step_counter = 0
 SAVE_INTERVAL = 3000 
 SAVE_DIR = "./logs/curriculum_logs" 
+HISTORY_PATH = os.path.join(SAVE_DIR, "curriculum_history.bin")
+ERROR_STREAM_PATH = os.path.join(SAVE_DIR, "curriculum_errors.bin")
 os.makedirs(SAVE_DIR, exist_ok=True)
 
 grid_curriculum = None  # Global variable to hold the curriculum manager instance
+history_writer = None  # Background writer of the curriculum history file
+error_stream_writer = None  # Background writer of the recorded tracking errors
+pending_curriculum_state = None  # Checkpointed state restored when the manager is created
+sparse_curriculum = None  # N-D curriculum manager used by `sparse_command_levels`
+
+# Column of each velocity axis in the command, and policy observation indices of its
+# measured and commanded value
+VELOCITY_COMMAND_AXES = {"lin_vel_x": 0, "lin_vel_y": 1, "ang_vel_z": 2}
+VELOCITY_OBS_INDICES = {"lin_vel_x": (0, 9), "lin_vel_y": (1, 10), "ang_vel_z": (5, 11)}
 
 class GridCurriculumManager:
     """
@@ -32,6 +62,35 @@ class GridCurriculumManager:
         max_range: Max absolute value for velocity ranges.
         start_range: Initial command range.
         unlocked_bins: Active unlocked grid bins.
+        dense: Keeps all bin state in integer-indexed device tensors instead of Python containers.
+        num_groups: Number of independent grids in dense mode, e.g. one per terrain type.
+        distributed: Dense mode synchronization of the curriculum across training processes,
+            enabled when launched with a WORLD_SIZE above one.
+        sync_interval: Number of training iterations between two reductions of the statistics
+            across ranks (see `sync_distributed`).
+        update_interval: Dense mode number of calls between two unlock decisions. Above one,
+            statistics are accumulated on device in between.
+        deferred: Whether unlock decisions are deferred, either by `update_interval` or
+            because the curriculum is distributed.
+        unlock_mask: Dense mode unlock state of each bin (num_groups, num_lin, num_ang).
+        confidence_grid: Confidence of each bin, used in delay mode. Shaped (num_lin, num_ang)
+            in set mode and (num_groups, num_lin, num_ang) in dense mode.
+        device_metrics: Keeps the logged statistics on device until the runner's logging step.
+        relock_factor: Dense mode hysteresis factor. Unlocked bins whose error exceeds the
+            unlock thresholds times this factor lose confidence and are re-locked. None never
+            re-locks.
+        confidence_decay: Confidence removed from a regressed bin on each regression.
+        max_confidence: Cap of the bin confidences. A bin that was tracked well for a long
+            time is then re-locked after at most (max_confidence - 1) / confidence_decay
+            regressions, plus one.
+        adaptive_eps: Dense mode per-bin error thresholds, scaled by
+            (1 + eps_magnitude_scale * |command|) along each axis. With `log_error_decay`, each
+            bin decays its own thresholds by 0.98 every `eps_decay_samples` of its samples,
+            instead of following the global schedule.
+        eps_bins: Per-bin [lin, ang] error thresholds when `adaptive_eps` is set (num_groups * num_bins, 2).
+        error_fast: Fast moving average of the normalized tracking error of each bin.
+        error_slow: Slow moving average of the normalized tracking error of each bin. The gap
+            between both averages is the learning progress used by `sample_cmd_indices`.
 
     """
 
@@ -47,6 +106,17 @@ class GridCurriculumManager:
         delay: bool = False,
         window_size: int = 2,
         log_error_decay: bool = False,
+        dense: bool = False,
+        device_metrics: bool = False,
+        num_groups: int = 1,
+        relock_factor: float = None,
+        confidence_decay: float = 0.5,
+        max_confidence: float = 2.0,
+        adaptive_eps: bool = False,
+        eps_magnitude_scale: float = 0.5,
+        eps_decay_samples: float = 100.0,
+        sync_interval: int = 1,
+        update_interval: int = 1,
     ) -> None:
         
         self.device = device
@@ -66,12 +136,109 @@ class GridCurriculumManager:
 
         self.delay = delay
         self.log_error_decay = log_error_decay
+        self.dense = dense
+        self.device_metrics = device_metrics
+        self.num_groups = num_groups
+
+        self.relock_factor = relock_factor
+        self.confidence_decay = confidence_decay
+        self.max_confidence = max_confidence
+        self.adaptive_eps = adaptive_eps
+        self.eps_magnitude_scale = eps_magnitude_scale
+        self.eps_decay_samples = eps_decay_samples
+        self.sync_interval = sync_interval
+        self.update_interval = update_interval
+        self.distributed = int(os.environ.get("WORLD_SIZE", "1")) > 1
+        self.deferred = self.distributed or self.update_interval > 1
+
+        if self.distributed and not self.dense:
+            raise ValueError("Distributed training requires the dense curriculum.")
+        if self.update_interval > 1 and not self.dense:
+            raise ValueError("Deferred curriculum updates require dense mode.")
+
+        if self.num_groups > 1 and not self.dense:
+            raise ValueError("Multiple curriculum groups require dense mode.")
+        if self.relock_factor is not None and not self.dense:
+            raise ValueError("Re-locking bins requires dense mode.")
+        if self.adaptive_eps and not self.dense:
+            raise ValueError("Per-bin error thresholds require dense mode.")
+        if max_confidence < 1.0:
+            raise ValueError(f"max_confidence must be at least 1 for bins to unlock, got {max_confidence}.")
+        if self.relock_factor is not None and self.relock_factor <= 1.0:
+            raise ValueError(f"relock_factor must be above 1 to leave a hysteresis band, got {relock_factor}.")
 
         self.cmd_map, self.lin_vals, self.ang_vals = self._build_command_grid()
+        self.num_lin = len(self.lin_vals)
+        self.num_ang = len(self.ang_vals)
+        self.num_bins = self.num_lin * self.num_ang
         self.dx = (self.lin_vals[1] - self.lin_vals[0]).item()
         self.dz = (self.ang_vals[1] - self.ang_vals[0]).item()
         self.unlocked_bins: Set[Tuple[float, float]] = set()
-        self.bin_confidence = {tuple(cmd.tolist()): 0.0 for cmd in self.cmd_map}
+        self.confidence_grid = torch.zeros(self.num_lin, self.num_ang, device=self.device)
+
+        # Normalized key of every flat bin index, used to translate mask state back to bin tuples
+        self._bin_keys = [normalize_bin_key(tuple(cmd), self.steps) for cmd in self.cmd_map.tolist()]
+        self._key_to_index = {key: i for i, key in enumerate(self._bin_keys)}
+        self._lin_keys = [self._bin_keys[i * self.num_ang][0] for i in range(self.num_lin)]
+        self._ang_keys = [self._bin_keys[j][1] for j in range(self.num_ang)]
+
+        # Set mode range bounds, widened incrementally as bins are unlocked
+        self._range_bounds = None
+
+        # Learning progress of every bin, used for prioritized command sampling
+        num_cells = self.num_groups * self.num_bins
+        self.progress_fast_rate = 0.1
+        self.progress_slow_rate = 0.01
+        self.priority_floor = 0.05
+        self.error_fast = torch.zeros(num_cells, device=self.device)
+        self.error_slow = torch.zeros(num_cells, device=self.device)
+        self.error_visited = torch.zeros(num_cells, dtype=torch.bool, device=self.device)
+        self._start_mask = (
+            (self.lin_vals.abs() <= self.start_range + 1e-6)[:, None]
+            & (self.ang_vals.abs() <= self.start_range + 1e-6)[None, :]
+        )
+
+        if self.dense:
+            self._init_dense_state()
+
+    def _init_dense_state(self) -> None:
+        """
+        Allocates the integer-indexed device tensors holding the dense curriculum state.
+
+        Every group holds its own grid, and group `g` owns the flat indices
+        [g * num_bins, (g + 1) * num_bins). The error window of every bin is a ring buffer of
+        shape (window_size, 2). One extra row is allocated as a scratch target for samples
+        that fall out of the window within a single batched write, which keeps the write free
+        of host synchronization.
+        """
+        grid_shape = (self.num_groups, self.num_lin, self.num_ang)
+        num_cells = self.num_groups * self.num_bins
+        self.unlock_mask = torch.zeros(grid_shape, dtype=torch.bool, device=self.device)
+        self.confidence_grid = torch.zeros(grid_shape, device=self.device)
+        self._start_bounds = torch.tensor(
+            [-self.start_range, self.start_range, -self.start_range, self.start_range], device=self.device
+        )
+        self.win_errors = torch.zeros(num_cells + 1, self.window_size, 2, device=self.device)
+        self.win_counts = torch.zeros(num_cells, dtype=torch.long, device=self.device)
+
+        # Double-buffered host copies of the bound indices, see `_publish_bounds`
+        pin_memory = torch.device(self.device).type == "cuda"
+        self._bounds_host = torch.zeros(2, 5, dtype=torch.long, pin_memory=pin_memory)
+        self._publish_slot = 0
+        self._pending_publish = None
+        self._publish_stale = False
+        self._published_bounds = self._bounds_from_indices([0, 0, 0, 0, 0])
+
+        if self.deferred:
+            # Rows of [count, sum_v, sum_w] per bin since the last unlock decision
+            self._sync_stats = torch.zeros(num_cells, 3, device=self.device)
+            self._sync_calls = 0
+
+        if self.adaptive_eps:
+            self._eps_scale = (1.0 + self.eps_magnitude_scale * self.cmd_map.abs()).repeat(self.num_groups, 1)
+            self._eps_base = torch.tensor([self.EPS_V0, self.EPS_W0], device=self.device)
+            self.bin_samples = torch.zeros(num_cells, device=self.device)
+            self.eps_bins = self._eps_base * self._eps_scale
 
     def _build_command_grid(self) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
         """
@@ -123,27 +290,81 @@ class GridCurriculumManager:
             Tensor: Closest bin for each input command (E, 2).
 
         """
-        distances = torch.norm(cmds.unsqueeze(1) - self.cmd_map.unsqueeze(0), dim=2)
-        nearest_idx = torch.argmin(distances, dim=1)
-        return self.cmd_map[nearest_idx]
-    
-    def update_bin_confidence(self, newly_unlocked: Set[Tuple[float, float]]) -> None:
+        _, centers = self.map_commands_to_indices(cmds)
+        return centers
+
+    def map_commands_to_indices(self, cmds: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
         """
-        Updates confidence levels for each bin based on recent performance.
+
+        Maps each command to its grid cell directly from the uniform grid spacing.
+
+        Commands outside the grid are clamped to the border bins. Runs in O(E) time and
+        memory, without comparing against every bin of `cmd_map`.
+
+        Args:
+            cmds: Commands of shape (E, 2).
+
+        Returns:
+            Tuple of:
+                idx: Per-axis grid indices [lin_idx, ang_idx] (E, 2).
+                centers: Bin center for each input command (E, 2).
+
+        """
+        lin_idx = self.lin_indices(cmds[:, 0])
+        ang_idx = self.ang_indices(cmds[:, 1])
+        idx = torch.stack([lin_idx, ang_idx], dim=1)
+        centers = torch.stack([self.lin_vals[lin_idx], self.ang_vals[ang_idx]], dim=1)
+        return idx, centers
+
+    def lin_indices(self, lin_vel: torch.Tensor) -> torch.Tensor:
+        """
+        Maps lin_vel_x values to their grid row (E,), clamped to the border bins.
+        """
+        return torch.round((lin_vel - self.lin_vals[0]) / self.steps).long().clamp_(0, self.num_lin - 1)
+
+    def ang_indices(self, ang_vel: torch.Tensor) -> torch.Tensor:
+        """
+        Maps ang_vel_z values to their grid column (E,), clamped to the border bins.
+        """
+        return torch.round((ang_vel - self.ang_vals[0]) / self.steps).long().clamp_(0, self.num_ang - 1)
+
+    def map_commands_to_bin_indices(self, cmds: torch.Tensor) -> torch.Tensor:
+        """
+
+        Maps each command to the flat index of its bin in `cmd_map`.
 
         Args:
-            newly_unlocked: Bins that achieved good performance in the current step.
+            cmds: Commands of shape (E, 2).
+
+        Returns:
+            Tensor: Flat bin index for each input command (E,).
+
+        """
+        idx, _ = self.map_commands_to_indices(cmds)
+        return idx[:, 0] * self.num_ang + idx[:, 1]
+    
+    @property
+    def bin_confidence(self) -> dict:
+        """
+        Confidence of each bin keyed by its (lin_vel_x, ang_vel_z) tuple in `cmd_map`.
         """
+        _, confidence = self.unlock_state()
+        return dict(zip(map(tuple, self.cmd_map.tolist()), confidence.flatten().tolist()))
 
-        expanded_neighbors = self._expand_neighbors(newly_unlocked)
-        for bin in expanded_neighbors:
-            mapped_bin = self.map_commands_to_bins(torch.tensor([bin], device=self.device))[0]
-            mapped_key = tuple(mapped_bin.tolist())
-            self.bin_confidence[mapped_key] += self.increment_confidence
+    def update_bin_confidence(self, newly_unlocked: Union[Set[Tuple[float, float]], torch.Tensor]) -> None:
+        """
+        Updates confidence levels for each bin based on recent performance.
 
-        for bin, score in self.bin_confidence.items():
-            if score >= 1.0:
-                self.unlocked_bins.add(bin)
+        Args:
+            newly_unlocked: Bins that achieved good performance in the current step, either as a
+                set of bin tuples or as a boolean mask (num_lin, num_ang).
+        """
+        if not isinstance(newly_unlocked, torch.Tensor):
+            newly_unlocked = self._keys_to_mask(newly_unlocked)
+        newly_confident = accumulate_confidence(
+            self.confidence_grid, newly_unlocked, self.increment_confidence, self.max_confidence
+        )
+        self._add_unlocked_bins(self._mask_to_keys(newly_confident))
 
     def update_unlocked_bins(self, matched_cmds: torch.Tensor, v_error: torch.Tensor, w_error: torch.Tensor):
         """
@@ -156,22 +377,11 @@ class GridCurriculumManager:
             w_error: Absolute error of angular velocity (E,).
 
         """
-        cell_perf = {}
-        for i in range(matched_cmds.shape[0]):
-            key = normalize_bin_key(tuple(matched_cmds[i].tolist()), self.steps)
-            cell_perf.setdefault(key, []).append((v_error[i].item(), w_error[i].item()))
-
-        cell_avg = {
-            k: (sum(e[0] for e in v_w_list) / len(v_w_list),
-                sum(e[1] for e in v_w_list) / len(v_w_list))
-            for k, v_w_list in cell_perf.items()
-        }
-
         if self.delay:
-            newly_unlocked = {
-                k for k, (v_avg, w_avg) in cell_avg.items()
-                if v_avg < self.EPS_V and w_avg < self.EPS_W
-            }
+            bin_idx = self.map_commands_to_bin_indices(matched_cmds)
+            counts, v_avg, w_avg = self.aggregate_bin_errors(bin_idx, v_error, w_error)
+            passed = (counts > 0) & (v_avg < self.EPS_V) & (w_avg < self.EPS_W)
+            newly_unlocked = passed.view(self.num_lin, self.num_ang)
         else: 
             newly_unlocked = set()
             for cmd, ev, ew in zip(matched_cmds, v_error, w_error):
@@ -191,7 +401,250 @@ class GridCurriculumManager:
             self.update_bin_confidence(newly_unlocked)
         else:
             expanded = self._expand_neighbors(newly_unlocked)
-            self.unlocked_bins.update(expanded)
+            self._add_unlocked_bins(expanded)
+
+    def _add_unlocked_bins(self, bins: Set[Tuple[float, float]]) -> None:
+        """
+        Adds bins to `unlocked_bins` and widens the cached range bounds with the new bins only.
+
+        Args:
+            bins: Bins (tuples) to unlock.
+        """
+        new_bins = bins - self.unlocked_bins
+        if not new_bins:
+            return
+        self.unlocked_bins.update(new_bins)
+
+        lin = [b[0] for b in new_bins]
+        ang = [b[1] for b in new_bins]
+        if self._range_bounds is None:
+            self._range_bounds = ((min(lin), max(lin)), (min(ang), max(ang)))
+        else:
+            (lin_min, lin_max), (ang_min, ang_max) = self._range_bounds
+            self._range_bounds = (
+                (min(lin_min, *lin), max(lin_max, *lin)),
+                (min(ang_min, *ang), max(ang_max, *ang)),
+            )
+
+    def update_unlocked_bins_dense(
+        self,
+        bin_idx: torch.Tensor,
+        v_error: torch.Tensor,
+        w_error: torch.Tensor,
+        group_idx: torch.Tensor = None,
+    ) -> None:
+        """
+
+        Dense counterpart of `update_unlocked_bins`, running entirely as batched tensor ops.
+
+        In window mode the unlock test runs once per call on each touched bin, after all of
+        the call's samples have been written to its window. All groups are updated in the
+        same pass.
+
+        Args:
+            bin_idx: Flat bin index of each command (E,).
+            v_error: Absolute error of linear velocity (E,).
+            w_error: Absolute error of angular velocity (E,).
+            group_idx: Group of each command (E,). Defaults to group 0.
+
+        """
+        if group_idx is not None:
+            bin_idx = group_idx.long() * self.num_bins + bin_idx
+        num_cells = self.num_groups * self.num_bins
+
+        if self.deferred:
+            self._update_unlocked_bins_deferred(bin_idx, v_error, w_error)
+            return
+
+        if self.delay:
+            counts, v_avg, w_avg = self.aggregate_bin_errors(bin_idx, v_error, w_error)
+            measured = counts > 0
+        else:
+            counts = torch.bincount(bin_idx, minlength=num_cells)
+            ring_write(self.win_errors, self.win_counts, bin_idx, counts, torch.stack([v_error, w_error], dim=1))
+            win_avg = self.win_errors[:num_cells].mean(dim=1)
+            v_avg, w_avg = win_avg[:, 0], win_avg[:, 1]
+            measured = (counts > 0) & (self.win_counts >= self.window_size)
+
+        self._apply_bin_errors(counts, v_avg, w_avg, measured)
+        self._publish_bounds()
+
+    def _update_unlocked_bins_deferred(self, bin_idx: torch.Tensor, v_error: torch.Tensor, w_error: torch.Tensor) -> None:
+        """
+
+        Deferred variant of `update_unlocked_bins_dense`, used with `update_interval` above one
+        and in distributed training.
+
+        Per-bin error sums and counts are accumulated on device every call, and in window mode
+        the samples are also written to the error windows as they arrive. Without
+        distribution, bins are unlocked every `update_interval` calls with the same rule as
+        the non-deferred path. When distributed, curriculum calls only happen on steps with
+        resets and their timing differs across ranks, so the decision is left to
+        `sync_distributed`, which the runner calls at the same point of every iteration on
+        every rank.
+
+        Args:
+            bin_idx: Flat bin index of each command, including the group offset (E,).
+            v_error: Absolute error of linear velocity (E,).
+            w_error: Absolute error of angular velocity (E,).
+
+        """
+        samples = torch.stack([torch.ones_like(v_error), v_error, w_error], dim=1)
+        self._sync_stats.index_add_(0, bin_idx, samples)
+        if not self.delay:
+            counts = torch.bincount(bin_idx, minlength=self.num_groups * self.num_bins)
+            ring_write(self.win_errors, self.win_counts, bin_idx, counts, torch.stack([v_error, w_error], dim=1))
+        if self.distributed:
+            return
+
+        self._sync_calls += 1
+        if self._sync_calls % self.update_interval == 0:
+            self._apply_pooled_stats(self._pooled_stats())
+
+    def sync_distributed(self, iteration: int) -> None:
+        """
+
+        Reduces the pooled statistics across ranks and takes the unlock decisions, every
+        `sync_interval` training iterations.
+
+        Must be called on every rank at the same point of the same iterations, whether or not
+        the rank had resets since the last call, so the collective lines up with the other
+        collectives of the training loop. Every rank then takes the same decisions on the same
+        data, and the unlock mask stays identical everywhere without broadcasting it.
+
+        Args:
+            iteration: Training iteration index, identical on every rank.
+
+        """
+        if not self.distributed or iteration % self.sync_interval != 0:
+            return
+        # Wait for the runner to set up the process group before the first reduction
+        if not torch.distributed.is_initialized():
+            return
+
+        # The last row carries the thresholds, which follow each rank's own step counter
+        stats = self._pooled_stats()
+        stats[-1] = torch.tensor([0.0, 0.0, self.EPS_V, self.EPS_W], device=self.device)
+        torch.distributed.all_reduce(stats)
+        world_size = torch.distributed.get_world_size()
+        self.EPS_V, self.EPS_W = (stats[-1, 2:] / world_size).tolist()
+        self._apply_pooled_stats(stats)
+
+    def _pooled_stats(self) -> torch.Tensor:
+        """
+        Collects the statistics of the unlock decision, in a layout that sums across ranks.
+
+        In delay mode the tested errors are all samples pooled since the last decision. In
+        window mode they are the filled part of each bin's error window, so a bin is tested
+        once it was visited since the last decision and its window is full, as in the
+        non-deferred path. Across ranks, the windows of a bin are pooled.
+
+        Returns:
+            torch.Tensor: Rows of [new_count, tested_count, sum_v, sum_w] per bin, plus a
+            zero row for the thresholds (num_groups * num_bins + 1, 4).
+        """
+        num_cells = self.num_groups * self.num_bins
+        stats = torch.zeros(num_cells + 1, 4, device=self.device)
+        stats[:-1, 0] = self._sync_stats[:, 0]
+        if self.delay:
+            stats[:-1, 1:] = self._sync_stats
+        else:
+            stats[:-1, 1] = self.win_counts.clamp(max=self.window_size)
+            stats[:-1, 2:] = self.win_errors[:num_cells].sum(dim=1)
+        return stats
+
+    def _apply_pooled_stats(self, stats: torch.Tensor) -> None:
+        """
+        Unlocks bins from the statistics returned by `_pooled_stats`, then resets the pooled
+        samples.
+
+        The new bounds are published through `_publish_bounds`, so the caller can read them
+        with `published_range_bounds` without waiting on the device.
+
+        Args:
+            stats: Per-bin decision statistics, possibly reduced across ranks.
+        """
+        counts, tested = stats[:-1, 0], stats[:-1, 1]
+        means = stats[:-1, 2:] / tested.clamp(min=1)[:, None]
+        min_count = 1 if self.delay else self.window_size
+        measured = (counts > 0) & (tested >= min_count)
+        self._apply_bin_errors(counts.long(), means[:, 0], means[:, 1], measured)
+        self._sync_stats.zero_()
+        self._publish_bounds()
+
+    def _apply_bin_errors(
+        self, counts: torch.Tensor, v_avg: torch.Tensor, w_avg: torch.Tensor, measured: torch.Tensor
+    ) -> None:
+        """
+        Unlocks and re-locks bins from their aggregated tracking errors, see
+        `grid_ops.apply_unlock_decision`.
+
+        Args:
+            counts: Number of new samples per bin (num_groups * num_bins,).
+            v_avg: Mean linear velocity error per bin.
+            w_avg: Mean angular velocity error per bin.
+            measured: Bins with enough samples to be tested.
+        """
+        grid_shape = (self.num_groups, self.num_lin, self.num_ang)
+        if self.adaptive_eps:
+            self._update_bin_thresholds(counts)
+            eps_v, eps_w = self.eps_bins[:, 0].view(grid_shape), self.eps_bins[:, 1].view(grid_shape)
+        else:
+            eps_v, eps_w = self.EPS_V, self.EPS_W
+
+        apply_unlock_decision(
+            self.unlock_mask,
+            self.confidence_grid,
+            measured.view(grid_shape),
+            v_avg.view(grid_shape),
+            w_avg.view(grid_shape),
+            eps_v,
+            eps_w,
+            delay=self.delay,
+            increment=self.increment_confidence,
+            max_confidence=self.max_confidence,
+            relock_factor=self.relock_factor,
+            confidence_decay=self.confidence_decay,
+        )
+
+    def _update_bin_thresholds(self, counts: torch.Tensor) -> None:
+        """
+        Recomputes the per-bin error thresholds after a batch of samples, see
+        `grid_ops.bin_thresholds`.
+
+        Args:
+            counts: Number of samples per bin in this batch (num_groups * num_bins,).
+        """
+        self.bin_samples += counts
+        self.eps_bins = bin_thresholds(
+            self._eps_base, self._eps_scale, self.bin_samples, self.log_error_decay, self.eps_decay_samples
+        )
+
+    def aggregate_bin_errors(
+        self, bin_idx: torch.Tensor, v_error: torch.Tensor, w_error: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+
+        Reduces per-env tracking errors to per-bin means with a single scatter-add.
+
+        Args:
+            bin_idx: Flat bin index of each command, including the group offset (E,).
+            v_error: Absolute error of linear velocity (E,).
+            w_error: Absolute error of angular velocity (E,).
+
+        Returns:
+            Tuple of:
+                counts: Number of samples per bin (num_groups * num_bins,).
+                v_mean: Mean linear velocity error per bin, zero for empty bins.
+                w_mean: Mean angular velocity error per bin, zero for empty bins.
+
+        """
+        num_cells = self.num_groups * self.num_bins
+        counts = torch.bincount(bin_idx, minlength=num_cells)
+        errors = torch.stack([v_error, w_error], dim=1)
+        sums = torch.zeros(num_cells, 2, device=errors.device, dtype=errors.dtype).index_add_(0, bin_idx, errors)
+        means = sums / counts.clamp(min=1).unsqueeze(1)
+        return counts, means[:, 0], means[:, 1]
 
     def _expand_neighbors(self, cells: Set[Tuple[float, float]]) -> Set[Tuple[float, float]]:
         """
@@ -203,31 +656,290 @@ class GridCurriculumManager:
         Returns:
             Set[Tuple[float, float]]: Expanded set including original bins and their valid neighbors.
         """
-        expanded = set()
-        for x, z in cells:
-            for dx_off in [-self.dx, 0, self.dx]:
-                for dz_off in [-self.dz, 0, self.dz]:
-                    neighbor = (x + dx_off, z + dz_off)
-                    if -self.max_range <= neighbor[0] <= self.max_range and -self.max_range <= neighbor[1] <= self.max_range:
-                        norm = normalize_bin_key(neighbor, self.steps)
-                        expanded.add(norm)
-        return expanded
+        if not cells:
+            return set()
+        return self._mask_to_keys(dilate_mask(self._keys_to_mask(cells)))
+
+    def _keys_to_mask(self, keys: Set[Tuple[float, float]]) -> torch.Tensor:
+        """
+        Converts a set of bin tuples into a boolean grid mask (num_lin, num_ang).
+        """
+        mask = torch.zeros(self.num_bins, dtype=torch.bool, device=self.device)
+        if keys:
+            flat_idx = [self._key_to_index[normalize_bin_key(key, self.steps)] for key in keys]
+            mask[torch.tensor(flat_idx, device=self.device)] = True
+        return mask.view(self.num_lin, self.num_ang)
+
+    def _mask_to_keys(self, mask: torch.Tensor) -> Set[Tuple[float, float]]:
+        """
+        Converts a boolean grid mask (num_lin, num_ang) into a set of normalized bin tuples.
+        """
+        flat_idx = mask.flatten().nonzero().squeeze(1).tolist()
+        return {self._bin_keys[i] for i in flat_idx}
 
     def get_range_bounds(self) -> Tuple[Tuple[float, float], Tuple[float, float]]:
         """
 
         Computes the min and max values from unlocked bins for both lin_vel_x and ang_vel_z.
 
+        In set mode the bounds are maintained incrementally as bins unlock. In dense mode they
+        are the latest bounds published after an update (see `published_range_bounds`), so
+        reading them never waits on the device.
+
         Returns:
             Tuple: ((min_lin, max_lin), (min_ang, max_ang))
 
         """
-        if not self.unlocked_bins:
+        if self.dense:
+            return self.published_range_bounds()
+        if self._range_bounds is None:
             return (-self.start_range, self.start_range), (-self.start_range, self.start_range)
-        unlocked_array = torch.tensor(list(self.unlocked_bins), device=self.device).reshape(-1, 2)
-        lin_bounds = (unlocked_array[:, 0].min().item(), unlocked_array[:, 0].max().item())
-        ang_bounds = (unlocked_array[:, 1].min().item(), unlocked_array[:, 1].max().item())
-        return lin_bounds, ang_bounds
+        return self._range_bounds
+
+    def _bounds_from_indices(self, bound_idx: List[int]) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+        """
+        Converts host bound indices [any_unlocked, lin_lo, lin_hi, ang_lo, ang_hi] to range bounds.
+        """
+        any_unlocked, lin_lo, lin_hi, ang_lo, ang_hi = bound_idx
+        if not any_unlocked:
+            return (-self.start_range, self.start_range), (-self.start_range, self.start_range)
+        return (
+            (self._lin_keys[lin_lo], self._lin_keys[lin_hi]),
+            (self._ang_keys[ang_lo], self._ang_keys[ang_hi]),
+        )
+
+    def _publish_bounds(self) -> None:
+        """
+        Starts a non-blocking copy of the current bound indices into the next host buffer.
+
+        The two pinned host buffers alternate, so a copy in flight never overwrites the
+        buffer last read by `published_range_bounds`. A completed copy is consumed before a
+        new one starts. A copy still in flight is left in place until it has been read, and
+        the newer bounds are published right after that read, so every publish is read in
+        turn and the host bounds keep following the unlock mask.
+        """
+        if self._consume_publish():
+            self._publish_stale = True
+            return
+        self._publish_stale = False
+
+        bound_idx = mask_bound_indices(self.unlock_mask.any(dim=0))
+        slot = self._publish_slot
+        self._bounds_host[slot].copy_(bound_idx, non_blocking=True)
+        event = None
+        if self._bounds_host.is_pinned():
+            event = torch.cuda.Event()
+            event.record()
+        self._pending_publish = (slot, event)
+        self._publish_slot = 1 - slot
+
+    def _consume_publish(self) -> bool:
+        """
+        Reads the pending host copy of the bound indices if it has completed.
+
+        Returns:
+            bool: Whether a copy is still in flight.
+        """
+        if self._pending_publish is None:
+            return False
+        slot, event = self._pending_publish
+        if event is not None and not event.query():
+            return True
+        self._published_bounds = self._bounds_from_indices(self._bounds_host[slot].tolist())
+        self._pending_publish = None
+        return False
+
+    def published_range_bounds(self) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+        """
+
+        Returns the latest range bounds whose copy to the host has completed, without
+        waiting on the device.
+
+        Returns:
+            Tuple: ((min_lin, max_lin), (min_ang, max_ang))
+
+        """
+        if not self._consume_publish() and self._publish_stale:
+            self._publish_bounds()
+        return self._published_bounds
+
+    def env_range_bounds(self, group_idx: torch.Tensor) -> torch.Tensor:
+        """
+        Returns the command range bounds of each env's curriculum group, on device.
+
+        Args:
+            group_idx: Group of each env (E,).
+
+        Returns:
+            torch.Tensor: [lin_min, lin_max, ang_min, ang_max] per env (E, 4).
+        """
+        return self._bound_values(self.unlock_mask)[group_idx.long()]
+
+    def _bound_values(self, mask: torch.Tensor) -> torch.Tensor:
+        """
+        Computes [lin_min, lin_max, ang_min, ang_max] of a mask (..., num_lin, num_ang) on
+        device, falling back to the start range where nothing is unlocked.
+        """
+        return bound_values(mask, self.lin_vals, self.ang_vals, self._start_bounds)
+
+    def update_learning_progress(
+        self,
+        bin_idx: torch.Tensor,
+        v_error: torch.Tensor,
+        w_error: torch.Tensor,
+        group_idx: torch.Tensor = None,
+    ) -> None:
+        """
+
+        Updates the fast and slow error averages of the bins visited in this batch.
+
+        Errors are normalized by the current thresholds, per bin with `adaptive_eps`, so both
+        velocity components weigh the same. A bin seen for the first time starts both averages at its current error.
+
+        Args:
+            bin_idx: Flat bin index of each command (E,).
+            v_error: Absolute error of linear velocity (E,).
+            w_error: Absolute error of angular velocity (E,).
+            group_idx: Group of each command (E,). Defaults to group 0.
+
+        """
+        if group_idx is not None:
+            bin_idx = group_idx.long() * self.num_bins + bin_idx
+        counts, v_avg, w_avg = self.aggregate_bin_errors(bin_idx, v_error, w_error)
+        if self.adaptive_eps:
+            error = v_avg / self.eps_bins[:, 0] + w_avg / self.eps_bins[:, 1]
+        else:
+            error = v_avg / self.EPS_V + w_avg / self.EPS_W
+
+        seen = counts > 0
+        first = seen & ~self.error_visited
+        self.error_fast = torch.where(first, error, self.error_fast)
+        self.error_slow = torch.where(first, error, self.error_slow)
+        self.error_fast += seen * self.progress_fast_rate * (error - self.error_fast)
+        self.error_slow += seen * self.progress_slow_rate * (error - self.error_slow)
+        self.error_visited |= seen
+
+    def sampling_priorities(self) -> torch.Tensor:
+        """
+        Computes the sampling weight of every bin from its learning progress.
+
+        Only unlocked bins get a weight. Unvisited bins and bins without measurable progress
+        keep `priority_floor`, so the whole unlocked region is still covered. Groups with no
+        unlocked bin fall back to the start range.
+
+        Returns:
+            torch.Tensor: Non-negative weights (num_groups, num_bins).
+        """
+        if self.dense:
+            unlocked = self.unlock_mask.flatten(1)
+        else:
+            unlocked = self._keys_to_mask(self.unlocked_bins).flatten()[None]
+        unlocked = torch.where(unlocked.any(dim=1, keepdim=True), unlocked, self._start_mask.flatten()[None])
+
+        progress = (self.error_fast - self.error_slow).abs().view(self.num_groups, self.num_bins)
+        return (progress + self.priority_floor) * unlocked
+
+    def sample_cmd_indices(self, num_samples: int, group_idx: torch.Tensor = None) -> torch.Tensor:
+        """
+        Samples flat bin indices proportionally to their learning progress, in one batched
+        draw on device.
+
+        Args:
+            num_samples: Number of indices to draw.
+            group_idx: Group of each sample (num_samples,). Defaults to group 0.
+
+        Returns:
+            torch.Tensor: Flat bin indices (num_samples,).
+        """
+        weights = self.sampling_priorities()
+        if group_idx is None:
+            return torch.multinomial(weights[0], num_samples, replacement=True)
+        return torch.multinomial(weights[group_idx.long()], 1).squeeze(1)
+
+    def sample_commands(self, num_samples: int, group_idx: torch.Tensor = None) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Samples [lin_vel_x, ang_vel_z] commands from prioritized bins, jittered uniformly
+        within each bin.
+
+        Args:
+            num_samples: Number of commands to draw.
+            group_idx: Group of each sample (num_samples,). Defaults to group 0.
+
+        Returns:
+            Tuple of:
+                cmds: Sampled commands (num_samples, 2).
+                bin_idx: Flat bin index of each command (num_samples,).
+        """
+        bin_idx = self.sample_cmd_indices(num_samples, group_idx)
+        half_width = torch.tensor([self.dx, self.dz], device=self.device) / 2
+        jitter = (2 * torch.rand(num_samples, 2, device=self.device) - 1) * half_width
+        cmds = (self.cmd_map[bin_idx] + jitter).clamp(-self.max_range, self.max_range)
+        return cmds, bin_idx
+
+    def curriculum_metrics(self) -> dict:
+        """
+        Returns the curriculum statistics without synchronizing with the device.
+
+        Dense mode values are device tensors, set mode values are already host numbers.
+        """
+        if self.dense:
+            unlocked = self.unlock_mask.any(dim=0)
+            bounds = self._bound_values(unlocked)
+            metrics = {
+                "lin_vel_min": bounds[0],
+                "lin_vel_max": bounds[1],
+                "ang_vel_min": bounds[2],
+                "ang_vel_max": bounds[3],
+                "unlocked_bins": unlocked.sum(),
+            }
+        else:
+            (lin_min, lin_max), (ang_min, ang_max) = self.get_range_bounds()
+            metrics = {
+                "lin_vel_min": lin_min,
+                "lin_vel_max": lin_max,
+                "ang_vel_min": ang_min,
+                "ang_vel_max": ang_max,
+                "unlocked_bins": len(self.unlocked_bins),
+            }
+
+        if self.log_error_decay and self.adaptive_eps:
+            # Mean threshold over the unlocked bins of every group
+            unlocked = self.unlock_mask.flatten()
+            thresholds = (self.eps_bins * unlocked[:, None]).sum(dim=0) / unlocked.sum().clamp(min=1)
+            metrics["erro_lin_threshold"] = thresholds[0]
+            metrics["erro_ang_threshold"] = thresholds[1]
+        elif self.log_error_decay:
+            metrics["erro_lin_threshold"] = self.EPS_V
+            metrics["erro_ang_threshold"] = self.EPS_W
+
+        return metrics
+
+    def unlock_state(self) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Returns the unlock mask and confidence grid (num_lin, num_ang) in either mode.
+
+        With several groups, a bin counts as unlocked if any group unlocked it, and its
+        confidence is the highest among the groups.
+        """
+        if self.dense:
+            return self.unlock_mask.any(dim=0), self.confidence_grid.amax(dim=0)
+        return self._keys_to_mask(self.unlocked_bins), self.confidence_grid
+
+    def num_unlocked_bins(self) -> int:
+        """
+        Returns the number of currently unlocked bins.
+        """
+        if self.dense:
+            return int(self.unlock_mask.any(dim=0).sum().item())
+        return len(self.unlocked_bins)
+
+    def unlocked_bin_keys(self) -> Set[Tuple[float, float]]:
+        """
+        Returns the unlocked bins as normalized (lin_vel_x, ang_vel_z) tuples in either mode.
+        """
+        if not self.dense:
+            return self.unlocked_bins
+        return self._mask_to_keys(self.unlock_mask.any(dim=0))
 
     def save_unlocked_bins(self, path: str):
         """
@@ -237,7 +949,7 @@ class GridCurriculumManager:
             path: File path to save the unlocked bin data.
         """
         with open(path, 'wb') as f:
-            pickle.dump(self.unlocked_bins, f)
+            pickle.dump(self.unlocked_bin_keys(), f)
 
     def save_bin_confidences(self, path: str):
         """
@@ -249,8 +961,158 @@ class GridCurriculumManager:
         with open(path, 'wb') as f:
             pickle.dump(self.bin_confidence, f)
 
+    def save_snapshot(self, path: str, confidence_dtype: str = "float32"):
+        """
+        Saves the unlock mask and bin confidences to a compact binary snapshot.
+
+        The file holds the grid geometry, the unlock mask as a packed bitset and the raw
+        confidence array (see `curriculum_io`), and is far smaller than the pickles.
+
+        Args:
+            path: File path to save the snapshot.
+            confidence_dtype: Storage dtype of the confidences, "float32" or "float16".
+        """
+        unlock_mask, confidence = self.unlock_state()
+        save_curriculum_snapshot(path, self.steps, self.max_range, unlock_mask, confidence, confidence_dtype)
+
+    def load_snapshot(self, path: str):
+        """
+        Restores the unlock mask and bin confidences from a binary snapshot.
+
+        Args:
+            path: File path of a snapshot written by `save_snapshot`.
+        """
+        header, unlock_mask, confidence = load_curriculum_snapshot(path)
+        if (header["num_lin"], header["num_ang"]) != (self.num_lin, self.num_ang) or header["steps"] != self.steps:
+            raise ValueError(f"Snapshot '{path}' was saved for a different grid: {header}.")
+        self._set_unlock_state(
+            torch.from_numpy(unlock_mask).to(self.device),
+            torch.from_numpy(confidence.astype(np.float32)).to(self.device),
+        )
+
+    def state_dict(self) -> dict:
+        """
+        Returns the full curriculum state, with tensors moved to the CPU.
+
+        Returns:
+            dict: Unlock mask, confidences, error windows and current thresholds.
+        """
+        unlock_mask = self.unlock_mask if self.dense else self._keys_to_mask(self.unlocked_bins)
+        state = {
+            "steps": self.steps,
+            "max_range": self.max_range,
+            "window_size": self.window_size,
+            "dense": self.dense,
+            "num_groups": self.num_groups,
+            "unlock_mask": unlock_mask.cpu(),
+            "confidence": self.confidence_grid.cpu(),
+            "error_fast": self.error_fast.cpu(),
+            "error_slow": self.error_slow.cpu(),
+            "error_visited": self.error_visited.cpu(),
+            "eps_v": self.EPS_V,
+            "eps_w": self.EPS_W,
+        }
+        if self.dense:
+            state["win_errors"] = self.win_errors.cpu()
+            state["win_counts"] = self.win_counts.cpu()
+            if self.adaptive_eps:
+                state["bin_samples"] = self.bin_samples.cpu()
+        else:
+            state["win_buffers"] = [[list(key), list(buf)] for key, buf in self.win_buffers.items()]
+        return state
+
+    def load_state_dict(self, state: dict) -> None:
+        """
+        Restores a state produced by `state_dict`.
+
+        Args:
+            state: Curriculum state to restore.
+        """
+        geometry = (state["steps"], state["max_range"], state["window_size"])
+        if geometry != (self.steps, self.max_range, self.window_size):
+            raise ValueError(
+                f"Curriculum state (steps, max_range, window_size) = {geometry} does not match "
+                f"{(self.steps, self.max_range, self.window_size)}."
+            )
+
+        self._set_unlock_state(state["unlock_mask"].to(self.device), state["confidence"].to(self.device))
+        self.EPS_V = state["eps_v"]
+        self.EPS_W = state["eps_w"]
+
+        # Learning progress was added later, older checkpoints start from scratch
+        if "error_fast" in state and state["error_fast"].shape == self.error_fast.shape:
+            self.error_fast.copy_(state["error_fast"])
+            self.error_slow.copy_(state["error_slow"])
+            self.error_visited.copy_(state["error_visited"])
+
+        # Error windows only carry over between managers of the same mode and grouping
+        if self.dense and state["dense"] and state["num_groups"] == self.num_groups:
+            self.win_errors.copy_(state["win_errors"])
+            self.win_counts.copy_(state["win_counts"])
+            if self.adaptive_eps and "bin_samples" in state:
+                self.bin_samples.copy_(state["bin_samples"])
+                self._update_bin_thresholds(torch.zeros_like(self.bin_samples))
+        elif not self.dense and not state["dense"]:
+            self.win_buffers.clear()
+            for key, buf in state["win_buffers"]:
+                self.win_buffers[tuple(key)].extend(tuple(e) for e in buf)
+
+    def _set_unlock_state(self, unlock_mask: torch.Tensor, confidence: torch.Tensor) -> None:
+        """
+        Replaces the unlock state and confidence grid in either mode.
+
+        Grouped state (G, num_lin, num_ang) whose group count does not match is merged into
+        one grid, and a single grid is broadcast to every group in dense mode.
+
+        Args:
+            unlock_mask: Boolean unlock mask.
+            confidence: Confidence of each bin.
+        """
+        grid_shape = (-1, self.num_lin, self.num_ang)
+        if self.dense:
+            if unlock_mask.reshape(grid_shape).shape[0] != self.num_groups:
+                unlock_mask = unlock_mask.reshape(grid_shape).any(dim=0)
+                confidence = confidence.reshape(grid_shape).amax(dim=0)
+            self.unlock_mask.copy_(unlock_mask)
+            self.confidence_grid.copy_(confidence)
+            self._publish_bounds()
+        else:
+            self.confidence_grid.copy_(confidence.reshape(grid_shape).amax(dim=0))
+            self.unlocked_bins = set()
+            self._range_bounds = None
+            self._add_unlocked_bins(self._mask_to_keys(unlock_mask.reshape(grid_shape).any(dim=0)))
+
 # Curriculum hook for updating command ranges based on performance
-def command_levels(env: ManagerBasedRLEnv, env_ids: List[int]) -> torch.Tensor:
+def curriculum_groups(env: ManagerBasedRLEnv, env_ids: Union[List[int], torch.Tensor, slice] = slice(None)) -> torch.Tensor:
+    """
+
+    Returns the curriculum group of each env, i.e. the sub-terrain of the tile it is placed on.
+
+    Args:
+        env: IsaacLab RL environment.
+        env_ids: Environment indices. Defaults to all envs.
+
+    Returns:
+        torch.Tensor: Group index of each env (E,).
+
+    """
+    return env_terrain_ids(env, env_ids)
+
+
+def command_levels(
+    env: ManagerBasedRLEnv,
+    env_ids: List[int],
+    dense: bool = False,
+    device_metrics: bool = False,
+    per_terrain: bool = False,
+    prioritized: bool = False,
+    relock_factor: float = None,
+    adaptive_eps: bool = False,
+    log_error_decay: bool = False,
+    sync_interval: int = 1,
+    update_interval: int = 1,
+    record_errors: bool = False,
+) -> torch.Tensor:
     """
 
     Curriculum hook for updating velocity command ranges based on bin-wise performance.
@@ -258,6 +1120,31 @@ def command_levels(env: ManagerBasedRLEnv, env_ids: List[int]) -> torch.Tensor:
     Args:
         env: IsaacLab RL environment.
         env_ids : Active environment indices.
+        dense: Keeps the curriculum state in dense device tensors (see `GridCurriculumManager`).
+            The command ranges then follow the bounds published without blocking, which
+            trail the unlock mask by the latency of one device-to-host copy, so resets never
+            wait on curriculum bookkeeping.
+        device_metrics: Returns no metrics here and leaves them on device, to be written at the
+            runner's logging step through `curriculum_log_metrics`.
+        per_terrain: Keeps one grid per terrain type, batched on device (implies `dense`). Use
+            with `CurriculumVelocityCommandCfg` so each env samples from its own terrain's ranges.
+        prioritized: Tracks the learning progress of every bin, for use with
+            `PrioritizedVelocityCommandCfg`.
+        relock_factor: Re-locks bins whose error regresses above this multiple of the unlock
+            thresholds (implies `dense`). None keeps unlocked bins forever.
+        adaptive_eps: Uses per-bin error thresholds scaled by command magnitude (implies
+            `dense`). With `log_error_decay`, each bin decays its thresholds with its own
+            sample count instead of the global schedule.
+        log_error_decay: Tightens the error thresholds over training, by 0.98 every 1e4
+            curriculum steps, down to 0.03.
+        sync_interval: Training iterations between two reductions of the curriculum statistics
+            across ranks in distributed training, which always runs the dense curriculum. The
+            runner drives the reductions through `rsl_rl_utils.attach_curriculum_sync`.
+        update_interval: Calls between two unlock decisions (implies `dense`), accumulating
+            the statistics on device in between. Combine with `device_metrics` to avoid any
+            host sync.
+        record_errors: Records the command and tracking errors of every call to
+            `ERROR_STREAM_PATH`, for offline replay with `scripts/eval/replay_curriculum.py`.
 
     Returns:
         torch.Tensor: Monitoring tensor, here max lin_vel_x.
@@ -265,21 +1152,48 @@ def command_levels(env: ManagerBasedRLEnv, env_ids: List[int]) -> torch.Tensor:
     """
     global grid_curriculum
     global curriculum_step_counter
+    global history_writer
+    global error_stream_writer
+
+    distributed = int(os.environ.get("WORLD_SIZE", "1")) > 1
 
     if grid_curriculum is None:
         grid_curriculum = GridCurriculumManager(
             device=env.device,
             num_envs=env.num_envs,
+            dense=dense or per_terrain or relock_factor is not None or adaptive_eps or distributed or update_interval > 1,
+            device_metrics=device_metrics,
+            num_groups=len(env.scene.terrain.cfg.terrain_generator.sub_terrains) if per_terrain else 1,
+            relock_factor=relock_factor,
+            adaptive_eps=adaptive_eps,
+            log_error_decay=log_error_decay,
+            sync_interval=sync_interval,
+            update_interval=update_interval,
         )
 
+        # Continue from a checkpoint when resuming
+        if pending_curriculum_state is not None and pending_curriculum_state["manager"] is not None:
+            grid_curriculum.load_state_dict(pending_curriculum_state["manager"])
+            curriculum_step_counter = pending_curriculum_state["step_counter"]
+
+        # Commands resampled before the manager existed have no cached bin yet
+        cmd_term = env.command_manager.get_term("base_velocity")
+        if hasattr(cmd_term, "refresh_bin_indices"):
+            cmd_term.refresh_bin_indices()
+
     rm = env.reward_manager
 
     if not isinstance(env.obs_buf, dict) or "policy" not in env.obs_buf:
         return {}
 
-    # Collect current commands and velocities
-    cmds = env.command_manager.get_command("base_velocity")[env_ids][:, [0, 2]]
-    
+    # Bin of each env's command, cached at resample time when the command term supports it
+    cmd_term = env.command_manager.get_term("base_velocity")
+    if hasattr(cmd_term, "bin_indices"):
+        bin_idx = cmd_term.bin_indices(env_ids)
+    else:
+        cmds = env.command_manager.get_command("base_velocity")[env_ids][:, [0, 2]]
+        bin_idx = grid_curriculum.map_commands_to_bin_indices(cmds)
+
     obs = env.obs_buf["policy"]
 
     v_actual = obs[env_ids, 0] # base_lin_vel_x
@@ -291,50 +1205,230 @@ def command_levels(env: ManagerBasedRLEnv, env_ids: List[int]) -> torch.Tensor:
     v_error = torch.abs(v_cmd - v_actual)  
     w_error = torch.abs(w_cmd - w_actual)   
 
-    # Activate log decay on errors
-    if grid_curriculum.log_error_decay:
+    # Record the raw stream for offline replay, before any curriculum decision
+    if record_errors and int(os.environ.get("RANK", "0")) == 0:
+        if error_stream_writer is None:
+            error_stream_writer = ErrorStreamWriter(ERROR_STREAM_PATH, append=pending_curriculum_state is not None)
+        cmds = env.command_manager.get_command("base_velocity")[env_ids][:, [0, 2]]
+        error_stream_writer.append(curriculum_step_counter, cmds, v_error, w_error)
+
+    # Activate log decay on errors, done per bin by the manager with adaptive thresholds
+    if grid_curriculum.log_error_decay and not grid_curriculum.adaptive_eps:
         grid_curriculum.EPS_V = max(0.03, grid_curriculum.EPS_V0 * 0.98 ** (curriculum_step_counter/1e4))
         grid_curriculum.EPS_W = max(0.03, grid_curriculum.EPS_W0 * 0.98 ** (curriculum_step_counter/1e4))
 
     # Update curriculum
-    matched_bins = grid_curriculum.map_commands_to_bins(cmds)
-    matched_bins = torch.tensor([
-        [round_to_step(x.item(), grid_curriculum.steps), round_to_step(z.item(), grid_curriculum.steps)]
-        for x, z in matched_bins
-    ], device=grid_curriculum.device)
-    grid_curriculum.update_unlocked_bins(matched_bins, v_error, w_error)
-
-    # Apply updated command bounds
+    group_idx = curriculum_groups(env, env_ids) if grid_curriculum.num_groups > 1 else None
+    if grid_curriculum.dense:
+        grid_curriculum.update_unlocked_bins_dense(bin_idx, v_error, w_error, group_idx)
+    else:
+        # Bin centers already lie on multiples of the step, so no re-rounding is needed
+        matched_bins = grid_curriculum.cmd_map[bin_idx]
+        grid_curriculum.update_unlocked_bins(matched_bins, v_error, w_error)
+    if prioritized:
+        grid_curriculum.update_learning_progress(bin_idx, v_error, w_error, group_idx)
+
+    # Apply updated command bounds, the union over all groups when training per terrain
     lin_range, ang_range = grid_curriculum.get_range_bounds()
     cmd_cfg = env.command_manager.cfg.base_velocity
-    cmd_cfg.ranges.lin_vel_x = lin_range
-    cmd_cfg.ranges.ang_vel_z = ang_range
+    if tuple(cmd_cfg.ranges.lin_vel_x) != lin_range:
+        cmd_cfg.ranges.lin_vel_x = lin_range
+    if tuple(cmd_cfg.ranges.ang_vel_z) != ang_range:
+        cmd_cfg.ranges.ang_vel_z = ang_range
 
     # Step counter & periodic saving
     curriculum_step_counter += len(env_ids)
 
-    if curriculum_step_counter % SAVE_INTERVAL < len(env_ids):
-        step_path = os.path.join(SAVE_DIR, f"unlocked_bin_step_{curriculum_step_counter}.pkl")
-        grid_curriculum.save_unlocked_bins(step_path)
-
-        if grid_curriculum.delay:
-            step_path = os.path.join(SAVE_DIR, f"bins_confidence_step_{curriculum_step_counter}.pkl")
-            grid_curriculum.save_bin_confidences(step_path)
+    # Ranks share one unlock mask, so only the first one writes the history
+    if curriculum_step_counter % SAVE_INTERVAL < len(env_ids) and int(os.environ.get("RANK", "0")) == 0:
+        if history_writer is None:
+            history_writer = CurriculumHistoryWriter(
+                HISTORY_PATH,
+                steps=grid_curriculum.steps,
+                max_range=grid_curriculum.max_range,
+                num_lin=grid_curriculum.num_lin,
+                num_ang=grid_curriculum.num_ang,
+                append=pending_curriculum_state is not None,
+            )
+        history_writer.append(curriculum_step_counter, *grid_curriculum.unlock_state())
+
+    # Metrics are materialized by the runner at logging time instead
+    if grid_curriculum.device_metrics:
+        return None
 
     result = {
-        "lin_vel_min": torch.tensor(lin_range[0], device=env.device).item(),
-        "lin_vel_max": torch.tensor(lin_range[1], device=env.device).item(),
-        "ang_vel_min": torch.tensor(ang_range[0], device=env.device).item(),
-        "ang_vel_max": torch.tensor(ang_range[1], device=env.device).item(),
-        "unlocked_bins": torch.tensor(len(grid_curriculum.unlocked_bins), device=env.device).item(),
+        "lin_vel_min": lin_range[0],
+        "lin_vel_max": lin_range[1],
+        "ang_vel_min": ang_range[0],
+        "ang_vel_max": ang_range[1],
+        "unlocked_bins": grid_curriculum.num_unlocked_bins(),
     }
 
     if grid_curriculum.log_error_decay:
-        result["erro_lin_threshold"] = torch.tensor(grid_curriculum.EPS_V, device=env.device).item()
-        result["erro_ang_threshold"] = torch.tensor(grid_curriculum.EPS_W, device=env.device).item()
+        metrics = grid_curriculum.curriculum_metrics()
+        result["erro_lin_threshold"] = float(metrics["erro_lin_threshold"])
+        result["erro_ang_threshold"] = float(metrics["erro_ang_threshold"])
+
+    return result
+
+
+def sparse_command_levels(
+    env: ManagerBasedRLEnv,
+    env_ids: List[int],
+    axes: Tuple[str, ...] = ("lin_vel_x", "lin_vel_y", "heading"),
+    steps: Tuple[float, ...] = (0.1, 0.1, 0.2),
+    max_range: Tuple[float, ...] = (3.0, 1.0, 3.2),
+    start_range: Tuple[float, ...] = (0.5, 0.5, 0.6),
+    eps: Tuple[float, ...] = (0.15, 0.15, 0.25),
+    window_size: int = 2,
+) -> dict:
+    """
+
+    Curriculum hook over any subset of the velocity command axes, backed by a sparse N-D grid.
+
+    Velocity axes are scored by their tracking error from the policy observations, and the
+    heading axis by the wrapped error between the heading target and the robot heading.
+    The unlocked bounding range of each axis is written to the matching command range.
+
+    Args:
+        env: IsaacLab RL environment.
+        env_ids : Active environment indices.
+        axes: Command axes of the grid, among lin_vel_x, lin_vel_y, ang_vel_z and heading.
+        steps: Step size between cells of each axis.
+        max_range: Max absolute value of each axis.
+        start_range: Initially unlocked range of each axis.
+        eps: Error threshold of each axis.
+        window_size: Number of errors averaged per cell.
+
+    Returns:
+        dict: Range bounds of every axis and number of unlocked cells.
+
+    """
+    global sparse_curriculum
+
+    if sparse_curriculum is None:
+        sparse_curriculum = SparseGridCurriculumManager(
+            device=env.device,
+            steps=steps,
+            max_range=max_range,
+            start_range=start_range,
+            eps=eps,
+            window_size=window_size,
+        )
+        if pending_curriculum_state is not None and "sparse" in pending_curriculum_state:
+            sparse_curriculum.load_state_dict(pending_curriculum_state["sparse"])
+
+    if not isinstance(env.obs_buf, dict) or "policy" not in env.obs_buf:
+        return {}
+
+    obs = env.obs_buf["policy"]
+    cmd_term = env.command_manager.get_term("base_velocity")
+
+    commands, errors = [], []
+    for axis in axes:
+        if axis == "heading":
+            heading_target = cmd_term.heading_target[env_ids]
+            commands.append(heading_target)
+            errors.append(torch.abs(wrap_to_pi(heading_target - cmd_term.robot.data.heading_w[env_ids])))
+        else:
+            actual_idx, cmd_idx = VELOCITY_OBS_INDICES[axis]
+            commands.append(cmd_term.command[env_ids, VELOCITY_COMMAND_AXES[axis]])
+            errors.append(torch.abs(obs[env_ids, cmd_idx] - obs[env_ids, actual_idx]))
 
+    sparse_curriculum.update(torch.stack(commands, dim=1), torch.stack(errors, dim=1))
+
+    # Apply updated command bounds
+    result = {}
+    ranges = env.command_manager.cfg.base_velocity.ranges
+    for axis, bounds in zip(axes, sparse_curriculum.get_range_bounds()):
+        if tuple(getattr(ranges, axis)) != bounds:
+            setattr(ranges, axis, bounds)
+        result[f"{axis}_min"], result[f"{axis}_max"] = bounds
+    result["unlocked_bins"] = sparse_curriculum.num_unlocked_cells()
     return result
 
+
+def curriculum_state_dict() -> dict:
+    """
+
+    Returns the curriculum state to be stored alongside a policy checkpoint.
+
+    Returns:
+        dict: Manager state and step counter, or None if the curriculum has not started.
+
+    """
+    if grid_curriculum is None and sparse_curriculum is None:
+        return pending_curriculum_state
+    state = {"manager": None, "step_counter": curriculum_step_counter}
+    if grid_curriculum is not None:
+        state["manager"] = grid_curriculum.state_dict()
+    if sparse_curriculum is not None:
+        state["sparse"] = sparse_curriculum.state_dict()
+    return state
+
+
+def load_curriculum_state_dict(state: dict) -> None:
+    """
+
+    Restores a curriculum state saved with a policy checkpoint.
+
+    The manager is created lazily on the first curriculum call, so the state is kept until
+    then and applied on creation.
+
+    Args:
+        state: State returned by `curriculum_state_dict`.
+
+    """
+    global pending_curriculum_state
+    global curriculum_step_counter
+
+    pending_curriculum_state = state
+    if grid_curriculum is not None and state["manager"] is not None:
+        grid_curriculum.load_state_dict(state["manager"])
+        curriculum_step_counter = state["step_counter"]
+    if sparse_curriculum is not None and "sparse" in state:
+        sparse_curriculum.load_state_dict(state["sparse"])
+
+
+def curriculum_sync(iteration: int) -> None:
+    """
+
+    Reduces the distributed curriculum statistics across ranks at a training iteration boundary.
+
+    Meant to be called by the runner on every rank at the same point of each iteration. The
+    manager is created on the initial reset of every rank, before training starts, so every
+    rank issues the same collectives.
+
+    Args:
+        iteration: Training iteration index, identical on every rank.
+
+    """
+    if grid_curriculum is not None and grid_curriculum.distributed:
+        grid_curriculum.sync_distributed(iteration)
+
+
+def curriculum_log_metrics() -> dict:
+    """
+
+    Materializes the device-side curriculum metrics on the host in a single transfer.
+
+    Meant to be called at the runner's logging boundaries. Returns an empty dict unless the
+    curriculum runs with `device_metrics` enabled, since the metrics are otherwise logged by
+    the curriculum manager itself.
+
+    Returns:
+        dict: Metric name to float value.
+
+    """
+    if grid_curriculum is None or not grid_curriculum.device_metrics:
+        return {}
+
+    metrics = grid_curriculum.curriculum_metrics()
+    values = torch.stack([
+        torch.as_tensor(v, dtype=torch.float32, device=grid_curriculum.device) for v in metrics.values()
+    ]).tolist()
+    return dict(zip(metrics.keys(), values))
+
 @configclass
 class CurriculumCfg:
     command_ranges = CurrTerm(func=command_levels)
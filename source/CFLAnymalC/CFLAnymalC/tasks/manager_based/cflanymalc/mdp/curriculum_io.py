@@ -0,0 +1,395 @@
+"""
+Binary persistence for the grid curriculum state.
+
+Snapshot file layout:
+    - 8-byte magic (b"CFLSNAP1") followed by a little-endian uint32 header length.
+    - UTF-8 JSON header with the grid geometry and the confidence dtype.
+    - The unlock mask packed as a bitset, then the confidence of every bin.
+
+History file layout:
+    - 8-byte magic (b"CFLHIST1") followed by a little-endian uint32 header length.
+    - UTF-8 JSON header with the grid geometry (steps, max_range, num_lin, num_ang).
+    - Fixed-size frames appended one after another, each holding the step index, the
+      unlock mask packed as a bitset and the float32 confidence of every bin.
+
+Because every frame has the same size, the whole file can be memory-mapped as a numpy
+structured array without reading or unpickling individual snapshots.
+
+Error stream file layout:
+    - 8-byte magic (b"CFLSTRM1") followed by a little-endian uint32 header length.
+    - UTF-8 JSON header (empty fields reserved for future use).
+    - One record per curriculum call: int64 step and uint32 sample count, followed by
+      float32 rows of [cmd_lin_vel_x, cmd_ang_vel_z, v_error, w_error].
+"""
+
+import abc
+import atexit
+import json
+import os
+import queue
+import struct
+import threading
+from typing import List, Tuple
+
+import numpy as np
+import torch
+
+HISTORY_MAGIC = b"CFLHIST1"
+SNAPSHOT_MAGIC = b"CFLSNAP1"
+STREAM_MAGIC = b"CFLSTRM1"
+
+
+def history_frame_dtype(num_bins: int) -> np.dtype:
+    """
+    Returns the structured dtype of one history frame.
+
+    Args:
+        num_bins: Number of bins in the command grid.
+
+    Returns:
+        np.dtype: Frame dtype with `step`, `mask` (packed bits) and `confidence` fields.
+    """
+    return np.dtype([
+        ("step", "<i8"),
+        ("mask", "u1", ((num_bins + 7) // 8,)),
+        ("confidence", "<f4", (num_bins,)),
+    ])
+
+
+def _encode_header(magic: bytes, header: dict) -> bytes:
+    header_bytes = json.dumps(header).encode("utf-8")
+    return magic + struct.pack("<I", len(header_bytes)) + header_bytes
+
+
+def _decode_header(buffer: bytes, magic: bytes) -> Tuple[dict, int]:
+    """
+    Decodes the JSON header at the start of a snapshot or history buffer.
+
+    Returns:
+        Tuple of the header dict and the byte offset of the payload.
+    """
+    if bytes(buffer[:len(magic)]) != magic:
+        raise ValueError(f"Expected a curriculum file with magic {magic!r}, got {bytes(buffer[:len(magic)])!r}.")
+    (header_len,) = struct.unpack_from("<I", buffer, len(magic))
+    offset = len(magic) + 4
+    header = json.loads(bytes(buffer[offset:offset + header_len]).decode("utf-8"))
+    return header, offset + header_len
+
+
+def _read_header(f, magic: bytes = HISTORY_MAGIC) -> Tuple[dict, int]:
+    """
+    Reads the JSON header of a history or error stream file.
+
+    Returns:
+        Tuple of the header dict and the byte offset of the first frame.
+    """
+    prefix = f.read(len(magic) + 4)
+    (header_len,) = struct.unpack_from("<I", prefix, len(magic))
+    return _decode_header(prefix + f.read(header_len), magic)
+
+
+def save_curriculum_snapshot(
+    path: str,
+    steps: float,
+    max_range: float,
+    unlock_mask: torch.Tensor,
+    confidence: torch.Tensor,
+    confidence_dtype: str = "float32",
+) -> None:
+    """
+    Writes the unlock mask and confidence grid to a compact binary snapshot.
+
+    Args:
+        path: Destination file path.
+        steps: Step size between bins.
+        max_range: Max absolute value of the grid.
+        unlock_mask: Boolean unlock mask (num_lin, num_ang).
+        confidence: Confidence of each bin (num_lin, num_ang).
+        confidence_dtype: Storage dtype of the confidences, "float32" or "float16".
+    """
+    if confidence_dtype not in ("float32", "float16"):
+        raise ValueError(f"Unsupported confidence dtype '{confidence_dtype}'.")
+    num_lin, num_ang = unlock_mask.shape
+    header = {
+        "version": 1,
+        "steps": steps,
+        "max_range": max_range,
+        "num_lin": int(num_lin),
+        "num_ang": int(num_ang),
+        "confidence_dtype": confidence_dtype,
+    }
+    mask_bits = np.packbits(unlock_mask.cpu().numpy().reshape(-1))
+    conf = confidence.float().cpu().numpy().reshape(-1).astype(np.dtype(confidence_dtype).newbyteorder("<"))
+    with open(path, "wb") as f:
+        f.write(_encode_header(SNAPSHOT_MAGIC, header))
+        f.write(mask_bits.tobytes())
+        f.write(conf.tobytes())
+
+
+def load_curriculum_snapshot(path_or_buffer) -> Tuple[dict, np.ndarray, np.ndarray]:
+    """
+    Reads a binary snapshot written by `save_curriculum_snapshot`.
+
+    The confidences are a zero-copy `numpy.frombuffer` view of the file contents, so many
+    snapshots can be loaded from memory-mapped or pre-read buffers cheaply.
+
+    Args:
+        path_or_buffer: File path, or bytes-like object holding the snapshot.
+
+    Returns:
+        Tuple of:
+            header: Grid geometry and confidence dtype.
+            unlock_mask: Boolean unlock mask (num_lin, num_ang).
+            confidence: Read-only confidence grid (num_lin, num_ang).
+    """
+    if isinstance(path_or_buffer, (str, os.PathLike)):
+        with open(path_or_buffer, "rb") as f:
+            path_or_buffer = f.read()
+    header, offset = _decode_header(path_or_buffer, SNAPSHOT_MAGIC)
+
+    num_lin, num_ang = header["num_lin"], header["num_ang"]
+    num_bins = num_lin * num_ang
+    mask_bytes = (num_bins + 7) // 8
+    mask_bits = np.frombuffer(path_or_buffer, dtype=np.uint8, count=mask_bytes, offset=offset)
+    unlock_mask = np.unpackbits(mask_bits, count=num_bins).astype(bool).reshape(num_lin, num_ang)
+    conf_dtype = np.dtype(header["confidence_dtype"]).newbyteorder("<")
+    confidence = np.frombuffer(path_or_buffer, dtype=conf_dtype, count=num_bins, offset=offset + mask_bytes)
+    return header, unlock_mask, confidence.reshape(num_lin, num_ang)
+
+
+def read_curriculum_history(path: str) -> Tuple[dict, np.ndarray]:
+    """
+    Memory-maps a curriculum history file.
+
+    Args:
+        path: Path to the history file.
+
+    Returns:
+        Tuple of:
+            header: Grid geometry (`steps`, `max_range`, `num_lin`, `num_ang`).
+            frames: Read-only structured array of frames.
+    """
+    with open(path, "rb") as f:
+        header, offset = _read_header(f)
+    dtype = history_frame_dtype(header["num_lin"] * header["num_ang"])
+    num_frames = (os.path.getsize(path) - offset) // dtype.itemsize
+    if num_frames == 0:
+        return header, np.zeros(0, dtype=dtype)
+    frames = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(num_frames,))
+    return header, frames
+
+
+def unpack_unlock_masks(header: dict, frames: np.ndarray) -> np.ndarray:
+    """
+    Unpacks the bitset masks of history frames.
+
+    Args:
+        header: History file header.
+        frames: Frames returned by `read_curriculum_history`.
+
+    Returns:
+        np.ndarray: Boolean unlock masks (F, num_lin, num_ang).
+    """
+    num_lin, num_ang = header["num_lin"], header["num_ang"]
+    bits = np.unpackbits(frames["mask"], axis=1, count=num_lin * num_ang)
+    return bits.astype(bool).reshape(-1, num_lin, num_ang)
+
+
+def read_error_stream(path: str) -> Tuple[dict, List[Tuple[int, np.ndarray]]]:
+    """
+    Reads an error stream file written by `ErrorStreamWriter`.
+
+    Args:
+        path: Path to the error stream file.
+
+    Returns:
+        Tuple of:
+            header: Stream header.
+            calls: (step, samples) per curriculum call, samples being float32 rows of
+                [cmd_lin_vel_x, cmd_ang_vel_z, v_error, w_error] (E, 4).
+    """
+    with open(path, "rb") as f:
+        header, offset = _read_header(f, STREAM_MAGIC)
+        buffer = f.read()
+    return header, [(step, samples) for step, samples, _ in _iter_stream_records(buffer)]
+
+
+def _iter_stream_records(buffer: bytes):
+    """
+    Iterates over the complete records of an error stream payload, stopping at a partially
+    written trailing record.
+
+    Yields:
+        Tuple of the step, the samples (E, 4) and the byte offset right after the record.
+    """
+    pos = 0
+    record = struct.Struct("<qI")
+    while pos + record.size <= len(buffer):
+        step, count = record.unpack_from(buffer, pos)
+        end = pos + record.size + count * 16
+        if end > len(buffer):
+            return
+        samples = np.frombuffer(buffer, dtype="<f4", count=count * 4, offset=pos + record.size)
+        yield step, samples.reshape(count, 4), end
+        pos = end
+
+
+class _QueuedFileWriter(abc.ABC):
+    """
+
+    Appends records to a file from a background thread.
+
+    Subclasses implement `_write`, which runs on the writer thread, so packing and file I/O
+    never run on the training thread.
+
+    """
+
+    def __init__(self, path: str, max_queue: int = 64) -> None:
+        self.path = path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def close(self) -> None:
+        """
+        Flushes pending records and stops the writer thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    @abc.abstractmethod
+    def _write(self, f, item) -> None:
+        """
+        Encodes one queued item and writes it to the open file, on the writer thread.
+        """
+
+    def _run(self) -> None:
+        with open(self.path, "ab") as f:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                self._write(f, item)
+                f.flush()
+
+
+class CurriculumHistoryWriter(_QueuedFileWriter):
+    """
+
+    Appends curriculum snapshots to a single history file from a background thread.
+
+    Snapshots are cloned on the caller's device and queued, so packing and file I/O never
+    run on the training thread. With `append`, an existing file with the same geometry is
+    continued instead of replaced.
+
+    Attributes:
+        path: Path to the history file.
+        header: Grid geometry stored in the file header.
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        steps: float,
+        max_range: float,
+        num_lin: int,
+        num_ang: int,
+        append: bool = False,
+        max_queue: int = 64,
+    ) -> None:
+
+        self.header = {
+            "version": 1,
+            "steps": steps,
+            "max_range": max_range,
+            "num_lin": num_lin,
+            "num_ang": num_ang,
+        }
+        self._dtype = history_frame_dtype(num_lin * num_ang)
+
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                existing, offset = _read_header(f)
+            geometry = ("steps", "max_range", "num_lin", "num_ang")
+            if any(existing[k] != self.header[k] for k in geometry):
+                raise ValueError(f"Curriculum history '{path}' was written for a different grid: {existing}.")
+            # Drop a partially written trailing frame before appending
+            num_frames = (os.path.getsize(path) - offset) // self._dtype.itemsize
+            with open(path, "r+b") as f:
+                f.truncate(offset + num_frames * self._dtype.itemsize)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(_encode_header(HISTORY_MAGIC, self.header))
+
+        super().__init__(path, max_queue)
+
+    def append(self, step: int, unlock_mask: torch.Tensor, confidence: torch.Tensor) -> None:
+        """
+        Queues a snapshot for writing.
+
+        Args:
+            step: Curriculum step index of the snapshot.
+            unlock_mask: Boolean unlock mask (num_lin, num_ang).
+            confidence: Confidence of each bin (num_lin, num_ang).
+        """
+        self._queue.put((step, unlock_mask.detach().clone(), confidence.detach().clone()))
+
+    def _write(self, f, item) -> None:
+        step, unlock_mask, confidence = item
+        frame = np.zeros(1, dtype=self._dtype)
+        frame["step"] = step
+        frame["mask"] = np.packbits(unlock_mask.cpu().numpy().reshape(-1))
+        frame["confidence"] = confidence.float().cpu().numpy().reshape(-1)
+        f.write(frame.tobytes())
+
+
+class ErrorStreamWriter(_QueuedFileWriter):
+    """
+
+    Records the commands and tracking errors seen by every curriculum call, for offline
+    replay with `scripts/eval/replay_curriculum.py`.
+
+    Commands are stored as raw values rather than bin indices, so the stream can be replayed
+    with any grid step. With `append`, an existing stream is continued instead of replaced.
+
+    """
+
+    def __init__(self, path: str, append: bool = False, max_queue: int = 256) -> None:
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                _, offset = _read_header(f, STREAM_MAGIC)
+                buffer = f.read()
+            # Drop a partially written trailing record before appending
+            end = 0
+            for _, _, end in _iter_stream_records(buffer):
+                pass
+            with open(path, "r+b") as f:
+                f.truncate(offset + end)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(_encode_header(STREAM_MAGIC, {"version": 1}))
+        super().__init__(path, max_queue)
+
+    def append(self, step: int, cmds: torch.Tensor, v_error: torch.Tensor, w_error: torch.Tensor) -> None:
+        """
+        Queues the samples of one curriculum call.
+
+        Args:
+            step: Curriculum step index of the call.
+            cmds: [lin_vel_x, ang_vel_z] command of each env (E, 2).
+            v_error: Absolute error of linear velocity (E,).
+            w_error: Absolute error of angular velocity (E,).
+        """
+        samples = torch.cat([cmds, v_error[:, None], w_error[:, None]], dim=1).detach().float()
+        self._queue.put((step, samples.clone()))
+
+    def _write(self, f, item) -> None:
+        step, samples = item
+        samples = samples.cpu().numpy().astype("<f4")
+        f.write(struct.pack("<qI", step, len(samples)))
+        f.write(samples.tobytes())
@@ -0,0 +1,230 @@
+"""
+Sparse N-dimensional command curriculum.
+
+Generalizes the [lin_vel_x, ang_vel_z] grid of `GridCurriculumManager` to any number of
+command axes. Cells are addressed by an integer key (mixed-radix code of the per-axis grid
+coordinates), and only cells that were visited or unlocked are stored, in a table sorted by
+key and searched with `torch.searchsorted`. A dense 3-D grid at 0.1 step spans over 200k
+cells, while the table only grows with the region the policy actually explores.
+"""
+
+import itertools
+from typing import List, Sequence, Tuple
+
+import torch
+
+from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.grid_ops import ring_write
+
+
+class SparseGridCurriculumManager:
+    """
+
+    Manages a curriculum over discretized command cells in N dimensions, storing only the
+    visited cells.
+
+    A cell unlocks once its last `window_size` tracking errors average below the threshold
+    of every axis, and unlocking also unlocks its 3^N - 1 neighbors.
+
+    Attributes:
+        device: Target device for tensors.
+        num_axes: Number of command axes.
+        steps: Step size between cells of each axis (N,).
+        max_range: Max absolute value of each axis (N,).
+        eps: Error threshold of each axis (N,).
+        window_size: Number of errors averaged per cell.
+        keys: Sorted keys of the stored cells (K,).
+        unlocked: Unlock state of each stored cell (K,).
+        win_errors: Ring buffer of recent errors of each stored cell, plus a last scratch row
+            for overwritten samples (K + 1, window_size, N).
+        win_counts: Number of errors ever recorded per stored cell (K,).
+
+    """
+
+    def __init__(
+        self,
+        device: torch.device,
+        steps: Sequence[float],
+        max_range: Sequence[float],
+        start_range: Sequence[float],
+        eps: Sequence[float],
+        window_size: int = 2,
+    ) -> None:
+
+        self.device = device
+        self.num_axes = len(steps)
+        self.steps = torch.tensor(steps, dtype=torch.float32, device=device)
+        self.max_range = torch.tensor(max_range, dtype=torch.float32, device=device)
+        self.eps = torch.tensor(eps, dtype=torch.float32, device=device)
+        self.window_size = window_size
+
+        # Cells per axis and mixed-radix strides of the cell key
+        self.num_cells = (2 * torch.round(self.max_range / self.steps) + 1).long()
+        strides = torch.ones(self.num_axes, dtype=torch.long)
+        for i in range(self.num_axes - 2, -1, -1):
+            strides[i] = strides[i + 1] * self.num_cells[i + 1].cpu()
+        self._strides = strides.to(device)
+        self._offsets = torch.tensor(
+            list(itertools.product((-1, 0, 1), repeat=self.num_axes)), dtype=torch.long, device=device
+        )
+
+        self.keys = torch.empty(0, dtype=torch.long, device=device)
+        self.unlocked = torch.empty(0, dtype=torch.bool, device=device)
+        self.win_errors = torch.zeros(1, self.window_size, self.num_axes, device=device)
+        self.win_counts = torch.empty(0, dtype=torch.long, device=device)
+
+        # Unlock every cell inside the start range
+        start = torch.tensor(start_range, dtype=torch.float32, device=device)
+        lo, hi = self.values_to_coords(-start[None])[0].tolist(), self.values_to_coords(start[None])[0].tolist()
+        start_coords = torch.tensor(
+            list(itertools.product(*[range(a, b + 1) for a, b in zip(lo, hi)])), dtype=torch.long, device=device
+        )
+        self._unlock(self.encode(start_coords))
+
+    def values_to_coords(self, values: torch.Tensor) -> torch.Tensor:
+        """
+        Maps command values (E, N) to integer cell coordinates, clamped to the grid.
+        """
+        coords = torch.round((values + self.max_range) / self.steps).long()
+        return torch.minimum(coords.clamp_(min=0), self.num_cells - 1)
+
+    def coords_to_values(self, coords: torch.Tensor) -> torch.Tensor:
+        """
+        Maps cell coordinates (E, N) to the command value at the cell center.
+        """
+        return coords * self.steps - self.max_range
+
+    def encode(self, coords: torch.Tensor) -> torch.Tensor:
+        """
+        Encodes cell coordinates (E, N) as integer keys (E,).
+        """
+        return (coords * self._strides).sum(dim=-1)
+
+    def decode(self, keys: torch.Tensor) -> torch.Tensor:
+        """
+        Decodes integer keys (E,) back to cell coordinates (E, N).
+        """
+        return (keys[:, None] // self._strides) % self.num_cells
+
+    def _lookup(self, keys: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Finds the table row of each key.
+
+        Returns:
+            Tuple of the row index (E,) and whether the key is stored (E,).
+        """
+        idx = torch.searchsorted(self.keys, keys)
+        if len(self.keys) == 0:
+            return idx, torch.zeros_like(keys, dtype=torch.bool)
+        found = self.keys[idx.clamp(max=len(self.keys) - 1)] == keys
+        return idx, found & (idx < len(self.keys))
+
+    def _insert(self, keys: torch.Tensor) -> None:
+        """
+        Adds the keys that are not stored yet to the table, keeping it sorted.
+        """
+        keys = torch.unique(keys)
+        _, found = self._lookup(keys)
+        new_keys = keys[~found]
+        if len(new_keys) == 0:
+            return
+
+        num_new = len(new_keys)
+        all_keys, order = torch.sort(torch.cat([self.keys, new_keys]))
+        self.keys = all_keys
+        self.unlocked = torch.cat([self.unlocked, self.unlocked.new_zeros(num_new)])[order]
+        self.win_errors = torch.cat([
+            self.win_errors[:-1], self.win_errors.new_zeros(num_new + 1, self.window_size, self.num_axes)
+        ])
+        self.win_errors[:-1] = self.win_errors[:-1][order]
+        self.win_counts = torch.cat([self.win_counts, self.win_counts.new_zeros(num_new)])[order]
+
+    def _unlock(self, keys: torch.Tensor) -> None:
+        self._insert(keys)
+        idx, _ = self._lookup(keys)
+        self.unlocked[idx] = True
+
+    def _dilate(self, keys: torch.Tensor) -> torch.Tensor:
+        """
+        Expands cells to their 3^N neighborhood, dropping neighbors outside the grid.
+
+        Args:
+            keys: Cell keys (M,).
+
+        Returns:
+            torch.Tensor: Unique keys of the cells and their neighbors.
+        """
+        coords = (self.decode(keys)[:, None, :] + self._offsets[None]).reshape(-1, self.num_axes)
+        valid = ((coords >= 0) & (coords < self.num_cells)).all(dim=1)
+        return torch.unique(self.encode(coords[valid]))
+
+    def update(self, commands: torch.Tensor, errors: torch.Tensor) -> None:
+        """
+
+        Records a batch of tracking errors and unlocks the cells that pass the thresholds.
+
+        Inserting new cells changes the table size, so this synchronizes with the host once
+        per call.
+
+        Args:
+            commands: Command of each env (E, N).
+            errors: Absolute tracking error of each axis (E, N).
+
+        """
+        keys = self.encode(self.values_to_coords(commands))
+        self._insert(keys)
+        idx, _ = self._lookup(keys)
+        counts = torch.bincount(idx, minlength=len(self.keys))
+
+        ring_write(self.win_errors, self.win_counts, idx, counts, errors)
+
+        full = self.win_counts >= self.window_size
+        passed = (self.win_errors[:-1].mean(dim=1) < self.eps).all(dim=1)
+        newly_unlocked = (counts > 0) & full & passed
+        if newly_unlocked.any():
+            self._unlock(self._dilate(self.keys[newly_unlocked]))
+
+    def get_range_bounds(self) -> List[Tuple[float, float]]:
+        """
+        Computes the bounding range of the unlocked cells along every axis.
+
+        Returns:
+            List[Tuple[float, float]]: (min, max) of each axis.
+        """
+        coords = self.decode(self.keys[self.unlocked])
+        bounds = torch.stack([
+            self.coords_to_values(coords.amin(dim=0)), self.coords_to_values(coords.amax(dim=0))
+        ], dim=1)
+        return [tuple(round(v, 4) for v in axis) for axis in bounds.tolist()]
+
+    def num_unlocked_cells(self) -> int:
+        return int(self.unlocked.sum().item())
+
+    def state_dict(self) -> dict:
+        """
+        Returns the sparse table and grid geometry, with tensors moved to the CPU.
+        """
+        return {
+            "steps": self.steps.tolist(),
+            "max_range": self.max_range.tolist(),
+            "window_size": self.window_size,
+            "keys": self.keys.cpu(),
+            "unlocked": self.unlocked.cpu(),
+            "win_errors": self.win_errors[:-1].cpu(),
+            "win_counts": self.win_counts.cpu(),
+        }
+
+    def load_state_dict(self, state: dict) -> None:
+        """
+        Restores a state produced by `state_dict`.
+
+        Args:
+            state: Curriculum state to restore.
+        """
+        geometry = (state["steps"], state["max_range"], state["window_size"])
+        if geometry != (self.steps.tolist(), self.max_range.tolist(), self.window_size):
+            raise ValueError(f"Sparse curriculum state (steps, max_range, window_size) = {geometry} does not match.")
+        self.keys = state["keys"].to(self.device)
+        self.unlocked = state["unlocked"].to(self.device)
+        scratch = torch.zeros(1, self.window_size, self.num_axes)
+        self.win_errors = torch.cat([state["win_errors"], scratch]).to(self.device)
+        self.win_counts = state["win_counts"].to(self.device)
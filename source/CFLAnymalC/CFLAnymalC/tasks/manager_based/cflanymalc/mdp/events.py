@@ -3,7 +3,7 @@ import isaaclab_tasks.manager_based.locomotion.velocity.mdp as mdp
 from isaaclab.managers import SceneEntityCfg
 from isaaclab.managers import EventTermCfg as EventTerm
 
-from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.terrain_stats import terrain_stats   
+from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.terrain_stats import terrain_stats, energy_stats
 
 @configclass
 class EventCfg:
@@ -12,12 +12,19 @@ class EventCfg:
     # Events triggered every simulation step
 
     # Event term that tracks per-terrain performance (reward, tracking error, episode length)
-    # terrain_perf = EventTerm(
-    #     func=terrain_stats,
-    #     mode="interval",
-    #     interval_range_s=(3, 4),
-    #     params=dict(window=500)
-    # )
+    terrain_perf = EventTerm(
+        func=terrain_stats,
+        mode="interval",
+        interval_range_s=(3, 4),
+        params=dict(window=500)
+    )
+
+    # Event term that tracks per-terrain and per-command power, cost of transport and torque saturation
+    energy_perf = EventTerm(
+        func=energy_stats,
+        mode="interval",
+        interval_range_s=(3, 4),
+    )
 
     # Events triggered once at environment startup (before any resets)
 
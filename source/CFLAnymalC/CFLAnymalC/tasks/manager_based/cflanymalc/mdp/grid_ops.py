@@ -0,0 +1,221 @@
+"""
+Batched tensor operations shared by the curriculum managers and the offline evaluation scripts.
+
+Holds the error window write, the unlock and re-lock decision, the per-bin thresholds and the
+range bound extraction of the grid curriculum. Only depends on torch, so the scripts under
+`scripts/eval` can load it by file path without the Isaac Sim runtime, and replay exactly the
+updates run during training.
+"""
+
+import torch
+
+
+def ring_write(
+    buffer: torch.Tensor, totals: torch.Tensor, ids: torch.Tensor, counts: torch.Tensor, values: torch.Tensor
+) -> None:
+    """
+    Writes samples into per-row ring buffers in one scatter, and adds them to the row totals.
+
+    Samples keep their order within each row, and only the last `window` samples of a row
+    survive a single call, matching the behaviour of a bounded deque. Older samples go to
+    the scratch row at index R, which keeps the write free of host synchronization.
+
+    Args:
+        buffer: Ring buffers (R + 1, window, K).
+        totals: Number of samples ever written per row (R,), updated in place.
+        ids: Row of each sample (E,).
+        counts: Number of samples per row in this call (R,), e.g. from `torch.bincount`.
+        values: Sample values (E, K).
+    """
+    window = buffer.shape[1]
+    order = torch.argsort(ids, stable=True)
+    sorted_ids = ids[order]
+    starts = torch.cumsum(counts, dim=0) - counts
+    rank = torch.arange(len(ids), device=ids.device) - starts[sorted_ids]
+
+    keep = rank >= counts[sorted_ids] - window
+    target = torch.where(keep, sorted_ids, len(counts))
+    slot = (totals[sorted_ids] + rank) % window
+
+    buffer[target, slot] = values[order]
+    totals += counts
+
+
+def dilate_mask(mask: torch.Tensor) -> torch.Tensor:
+    """
+    Expands a boolean grid mask to its 8-connected neighbors with a 3x3 max-pool.
+
+    Args:
+        mask: Boolean mask over the grid (..., num_lin, num_ang). Leading dims are batched.
+
+    Returns:
+        torch.Tensor: Dilated boolean mask with the same shape.
+    """
+    batched = mask.reshape(-1, 1, *mask.shape[-2:]).float()
+    pooled = torch.nn.functional.max_pool2d(batched, kernel_size=3, stride=1, padding=1)
+    return (pooled > 0).view(mask.shape)
+
+
+def accumulate_confidence(
+    confidence: torch.Tensor,
+    passed: torch.Tensor,
+    increment: float,
+    max_confidence: float,
+    regressed: torch.Tensor = None,
+) -> torch.Tensor:
+    """
+    Adds the confidence increment to the dilated mask of passing bins, capped at
+    `max_confidence` so regressions can still bring a bin back below 1.0.
+
+    Args:
+        confidence: Confidence of each bin (..., num_lin, num_ang), updated in place.
+        passed: Bins that achieved good performance, broadcastable to `confidence`.
+        increment: Confidence added per passing call.
+        max_confidence: Cap of the confidences.
+        regressed: Bins that regressed in the same call. They get no credit from their
+            neighbors, so each regression lowers their confidence.
+
+    Returns:
+        torch.Tensor: Boolean mask of bins whose confidence just reached 1.0.
+    """
+    credited = dilate_mask(passed)
+    if regressed is not None:
+        credited = credited & ~regressed
+    was_confident = confidence >= 1.0
+    confidence += increment * credited
+    confidence.clamp_(max=max_confidence)
+    return (confidence >= 1.0) & ~was_confident
+
+
+def apply_unlock_decision(
+    unlock_mask: torch.Tensor,
+    confidence: torch.Tensor,
+    measured: torch.Tensor,
+    v_avg: torch.Tensor,
+    w_avg: torch.Tensor,
+    eps_v,
+    eps_w,
+    delay: bool,
+    increment: float = 0.5,
+    max_confidence: float = 2.0,
+    relock_factor: float = None,
+    confidence_decay: float = 0.5,
+) -> None:
+    """
+    Unlocks and re-locks bins from their aggregated tracking errors, in place.
+
+    A measured bin passes when both errors are below the thresholds. Passing bins unlock
+    themselves and their neighbors, right away in window mode and through the confidences
+    in delay mode. With `relock_factor`, measured bins whose error exceeds the thresholds
+    times this factor lose `confidence_decay`, and are re-locked once below full
+    confidence. This runs after unlocking, so a regressed bin re-unlocked by a neighbor's
+    dilation in the same call stays locked.
+
+    Leading dims are batched, e.g. curriculum groups or replayed configurations, and the
+    statistics and thresholds broadcast against them.
+
+    Args:
+        unlock_mask: Unlock state of each bin (..., num_lin, num_ang).
+        confidence: Confidence of each bin, same shape as `unlock_mask`.
+        measured: Bins with enough samples to be tested.
+        v_avg: Mean linear velocity error per bin.
+        w_avg: Mean angular velocity error per bin.
+        eps_v: Linear velocity error threshold, a number or a per-bin tensor.
+        eps_w: Angular velocity error threshold, a number or a per-bin tensor.
+        delay: Unlocks through the confidences instead of right away.
+        increment: Confidence added per passing call in delay mode.
+        max_confidence: Cap of the confidences.
+        relock_factor: Hysteresis factor of the re-lock threshold, None never re-locks.
+        confidence_decay: Confidence removed from a regressed bin on each regression.
+    """
+    passed = measured & (v_avg < eps_v) & (w_avg < eps_w)
+    regressed = None
+    if relock_factor is not None:
+        regressed = measured & ((v_avg > relock_factor * eps_v) | (w_avg > relock_factor * eps_w))
+
+    if delay:
+        unlock_mask |= accumulate_confidence(confidence, passed, increment, max_confidence, regressed)
+    else:
+        unlock_mask |= dilate_mask(passed)
+
+    # In window mode confidences stay at zero, so regressed bins are re-locked immediately
+    if regressed is not None:
+        confidence.sub_(confidence_decay * regressed).clamp_(min=0.0)
+        unlock_mask &= ~(regressed & (confidence < 1.0))
+
+
+def bin_thresholds(
+    eps_base: torch.Tensor,
+    eps_scale: torch.Tensor,
+    bin_samples: torch.Tensor,
+    log_error_decay: bool,
+    eps_decay_samples: float,
+) -> torch.Tensor:
+    """
+    Computes per-bin error thresholds that grow with the command magnitude of the bin.
+
+    With `log_error_decay`, each bin tightens its thresholds by 0.98 every
+    `eps_decay_samples` of its own samples, down to a floor of 0.03 scaled by the same
+    magnitude factor.
+
+    Args:
+        eps_base: [eps_v, eps_w] base thresholds, broadcastable to `eps_scale`.
+        eps_scale: Magnitude factor of each bin and axis (..., num_bins, 2).
+        bin_samples: Number of samples ever recorded per bin (..., num_bins).
+        log_error_decay: Decays the thresholds with the bin sample counts.
+        eps_decay_samples: Samples per 0.98 decay step.
+
+    Returns:
+        torch.Tensor: [eps_v, eps_w] of each bin (..., num_bins, 2).
+    """
+    eps = eps_base * eps_scale
+    if log_error_decay:
+        decay = 0.98 ** (bin_samples / eps_decay_samples)
+        eps = torch.maximum(0.03 * eps_scale, eps * decay[..., None])
+    return eps
+
+
+def mask_bound_indices(mask: torch.Tensor) -> torch.Tensor:
+    """
+    Computes the first and last occupied row and column of a mask on device.
+
+    Args:
+        mask: Boolean mask (..., num_lin, num_ang). Leading dims are batched.
+
+    Returns:
+        torch.Tensor: [any_unlocked, lin_lo, lin_hi, ang_lo, ang_hi] as integers (..., 5).
+    """
+    num_lin, num_ang = mask.shape[-2:]
+    lin_occupied = mask.any(dim=-1).float()
+    ang_occupied = mask.any(dim=-2).float()
+    return torch.stack([
+        mask.flatten(-2).any(dim=-1).long(),
+        lin_occupied.argmax(dim=-1),
+        num_lin - 1 - lin_occupied.flip(-1).argmax(dim=-1),
+        ang_occupied.argmax(dim=-1),
+        num_ang - 1 - ang_occupied.flip(-1).argmax(dim=-1),
+    ], dim=-1)
+
+
+def bound_values(
+    mask: torch.Tensor, lin_vals: torch.Tensor, ang_vals: torch.Tensor, start_bounds: torch.Tensor
+) -> torch.Tensor:
+    """
+    Computes [lin_min, lin_max, ang_min, ang_max] of a mask on device, falling back to the
+    start range where nothing is unlocked.
+
+    Args:
+        mask: Boolean mask (..., num_lin, num_ang). Leading dims are batched.
+        lin_vals: Grid values along lin_vel_x (num_lin,).
+        ang_vals: Grid values along ang_vel_z (num_ang,).
+        start_bounds: Bounds of the start range (4,).
+
+    Returns:
+        torch.Tensor: Range bounds (..., 4).
+    """
+    bound_idx = mask_bound_indices(mask)
+    bounds = torch.stack([
+        lin_vals[bound_idx[..., 1]], lin_vals[bound_idx[..., 2]],
+        ang_vals[bound_idx[..., 3]], ang_vals[bound_idx[..., 4]],
+    ], dim=-1)
+    return torch.where(bound_idx[..., :1].bool(), bounds, start_bounds)
@@ -0,0 +1,104 @@
+"""
+Background TensorBoard sink for metrics computed inside the env step.
+
+Metric values are accumulated on device over a flush interval, and only the interval means
+are copied to the host, without blocking. Event-file I/O and protobuf serialization run on a
+background thread fed by a bounded queue, and flushes are dropped rather than waiting when
+the queue is full.
+"""
+
+import atexit
+import queue
+import threading
+from typing import List
+
+import torch
+from torch.utils.tensorboard import SummaryWriter
+
+
+class TensorBoardSink:
+    """
+
+    Aggregates scalar metrics on device and writes them to TensorBoard from a background thread.
+
+    Attributes:
+        log_dir: TensorBoard log directory.
+        tags: Tag of each logged scalar.
+        flush_interval: Number of `add` calls aggregated into one written point.
+        dropped: Number of flushes dropped because the queue was full.
+
+    """
+
+    def __init__(self, log_dir: str, tags: List[str], device: torch.device, flush_interval: int = 10, max_queue: int = 16):
+        self.log_dir = log_dir
+        self.tags = list(tags)
+        self.flush_interval = flush_interval
+        self.dropped = 0
+
+        self._sums = torch.zeros(len(self.tags), device=device)
+        self._counts = torch.zeros(len(self.tags), device=device)
+        self._calls = 0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="tensorboard-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, values: torch.Tensor, step: int, valid: torch.Tensor = None) -> None:
+        """
+        Accumulates one value per tag, flushing every `flush_interval` calls.
+
+        Args:
+            values: Value of each tag (K,).
+            step: Global step written with the next flush.
+            valid: Tags whose value is defined in this call (K,). Defaults to all tags.
+        """
+        valid = torch.ones_like(values) if valid is None else valid.to(values.dtype)
+        self._sums += values * valid
+        self._counts += valid
+        self._calls += 1
+        if self._calls % self.flush_interval == 0:
+            self.flush(step)
+
+    def flush(self, step: int) -> None:
+        """
+        Queues the interval means for writing and resets the accumulators.
+
+        Args:
+            step: Global step of the written point.
+        """
+        means = (self._sums / self._counts.clamp(min=1)).to("cpu", non_blocking=True)
+        counts = self._counts.to("cpu", non_blocking=True)
+        event = None
+        if self._sums.is_cuda:
+            event = torch.cuda.Event()
+            event.record()
+        self._sums.zero_()
+        self._counts.zero_()
+
+        try:
+            self._queue.put_nowait((step, means, counts, event))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        """
+        Writes pending points and stops the writer thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        writer = SummaryWriter(log_dir=self.log_dir)
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            step, means, counts, event = item
+            if event is not None:
+                event.synchronize()
+            for tag, value, count in zip(self.tags, means.tolist(), counts.tolist()):
+                if count:
+                    writer.add_scalar(tag, value, step)
+        writer.close()
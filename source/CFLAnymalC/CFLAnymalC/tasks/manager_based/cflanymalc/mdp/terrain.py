@@ -3,6 +3,7 @@ from isaaclab.sim import RigidBodyMaterialCfg
 from isaaclab.utils import configclass
 import trimesh
 import numpy as np
+import torch
 
 MeshPlaneTerrainCfg = terrain_gen.MeshPlaneTerrainCfg
 
@@ -82,3 +83,63 @@ def get_terrain_cfg(
         use_cache=False,
         sub_terrains=sub_terrains
     )
+
+
+def sub_terrain_id_table(cfg: terrain_gen.TerrainGeneratorCfg) -> np.ndarray:
+    """
+    Computes the sub-terrain index of every tile without generating any mesh.
+
+    Replays the tile assignment of `TerrainGenerator`: in curriculum mode each column takes
+    the sub-terrain of its cumulative proportion, and in random mode every tile draws its
+    sub-terrain (and a difficulty) from `np.random.default_rng(cfg.seed)` in row-major order.
+
+    Args:
+        cfg: Terrain generator configuration.
+
+    Returns:
+        np.ndarray: Index into `cfg.sub_terrains` of each tile (num_rows, num_cols).
+    """
+    proportions = np.array([sub_cfg.proportion for sub_cfg in cfg.sub_terrains.values()])
+    proportions /= np.sum(proportions)
+
+    if cfg.curriculum:
+        columns = [
+            np.min(np.where(col / cfg.num_cols + 0.001 < np.cumsum(proportions))[0]) for col in range(cfg.num_cols)
+        ]
+        return np.tile(np.array(columns), (cfg.num_rows, 1))
+
+    if cfg.seed is None:
+        # Tiles depend on the global numpy state, so only the generator itself knows them
+        from isaaclab.terrains.terrain_generator import TerrainGenerator
+        tg = TerrainGenerator(cfg=cfg, device="cpu")
+        index = {name: i for i, name in enumerate(cfg.sub_terrains.keys())}
+        return np.vectorize(index.get)(tg.sub_name)
+
+    rng = np.random.default_rng(cfg.seed)
+    table = np.zeros((cfg.num_rows, cfg.num_cols), dtype=np.int64)
+    for index in range(cfg.num_rows * cfg.num_cols):
+        sub_row, sub_col = np.unravel_index(index, (cfg.num_rows, cfg.num_cols))
+        table[sub_row, sub_col] = rng.choice(len(proportions), p=proportions)
+        rng.uniform(*cfg.difficulty_range)
+    return table
+
+
+def env_terrain_ids(env, env_ids=slice(None)) -> torch.Tensor:
+    """
+    Returns the sub-terrain index of each env's tile, on device.
+
+    The id table is computed once from the generator config and cached on the env. Names
+    are `list(env.scene.terrain.cfg.terrain_generator.sub_terrains)[id]`.
+
+    Args:
+        env: IsaacLab RL environment.
+        env_ids: Environment indices. Defaults to all envs.
+
+    Returns:
+        torch.Tensor: Sub-terrain index of each env (E,).
+    """
+    if not hasattr(env, "_terrain_id_table"):
+        table = sub_terrain_id_table(env.scene.terrain.cfg.terrain_generator)
+        env._terrain_id_table = torch.as_tensor(table, dtype=torch.long, device=env.device)
+    terrain = env.scene.terrain
+    return env._terrain_id_table[terrain.terrain_levels[env_ids], terrain.terrain_types[env_ids]]
@@ -10,19 +10,24 @@ Status:
 
 Main features:
     - Computes MAE for linear and angular velocity commands per terrain type.
+    - Estimates p50/p90/p99 of the tracking errors per terrain with histogram sketches.
     - Tracks success rates (timeouts vs terminations) per terrain.
+    - Computes mechanical power, cost of transport and torque saturation per terrain and
+      per curriculum command bin (`energy_stats`).
     - Logs stats to TensorBoard for visualization over time.
 
 Note:
     Requires a ManagerBasedRLEnv with terrain and policy observations enabled.
 """
 
-import os, collections, omni.log as log
+import os, omni.log as log
 import torch, numpy as np
-from torch.utils.tensorboard import SummaryWriter
+from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.logging_sink import TensorBoardSink
 from pathlib import Path
 from isaaclab.envs import ManagerBasedRLEnv
-from isaaclab.terrains.terrain_generator import TerrainGenerator
+from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.terrain import env_terrain_ids
+from CFLAnymalC.tasks.manager_based.cflanymalc.mdp.grid_ops import ring_write
+from CFLAnymalC.tasks.manager_based.cflanymalc.mdp import curriculum
 import inspect
 from types import ModuleType, FunctionType, MethodType
 
@@ -36,47 +41,113 @@ def active_terrain_names(env):
     Returns:
         List[str]: List of terrain names mapped from levels and types.
     """
-    if not hasattr(env, "_terrain_name_lut"):
-        tg = TerrainGenerator(
-            cfg=env.scene.terrain.cfg.terrain_generator,
-            device="cpu"
-        )
-        env._terrain_name_lut = tg.sub_name 
-
-    levels = env.scene.terrain.terrain_levels.cpu().numpy()
-    types  = env.scene.terrain.terrain_types.cpu().numpy()
-    lut    = env._terrain_name_lut
-    return [lut[l, t] for l, t in zip(levels, types)]
-
-def terrain_stats(env, env_ids, window=500, tb_root="terrain"):
+    names = list(env.scene.terrain.cfg.terrain_generator.sub_terrains.keys())
+    return [names[i] for i in env_terrain_ids(env).tolist()]
+
+class HistogramQuantiles:
+    """
+    Streaming quantile estimator over log-spaced buckets, batched over groups and channels.
+
+    Memory is fixed at (num_groups, num_channels, num_buckets) counts, whatever the number
+    of samples. With `decay` below one, counts fade by that factor on every update, so the
+    estimates follow recent samples.
+
+    Attributes:
+        edges (torch.Tensor): Bucket edges (num_buckets + 1,), the last bucket being open-ended.
+        counts (torch.Tensor): Weighted sample counts (num_groups, num_channels, num_buckets).
+    """
+
+    def __init__(self, num_groups, num_channels, device, min_value=1e-3, max_value=5.0, num_buckets=128, decay=1.0):
+        self.num_groups = num_groups
+        self.num_channels = num_channels
+        self.num_buckets = num_buckets
+        self.decay = decay
+        inner = torch.logspace(np.log10(min_value), np.log10(max_value), num_buckets - 1, device=device)
+        self.edges = torch.cat([torch.zeros(1, device=device), inner, inner[-1:]])
+        self.counts = torch.zeros(num_groups, num_channels, num_buckets, device=device)
+
+    def update(self, group_ids, values):
+        """
+        Adds a batch of samples.
+
+        Args:
+            group_ids (torch.Tensor): Group of each sample (E,).
+            values (torch.Tensor): Non-negative sample values per channel (E, num_channels).
+        """
+        if self.decay < 1.0:
+            self.counts *= self.decay
+        buckets = torch.bucketize(values, self.edges[1:-1], right=True)
+        channels = torch.arange(self.num_channels, device=values.device)
+        flat = (group_ids[:, None] * self.num_channels + channels) * self.num_buckets + buckets
+        self.counts.view(-1).index_add_(0, flat.flatten(), torch.ones(flat.numel(), device=values.device))
+
+    def quantiles(self, qs):
+        """
+        Interpolates quantiles linearly within their bucket.
+
+        Args:
+            qs (Sequence[float]): Quantiles in [0, 1].
+
+        Returns:
+            torch.Tensor: Estimates (num_groups, num_channels, len(qs)), zero for empty groups.
+        """
+        q = torch.as_tensor(qs, dtype=self.counts.dtype, device=self.counts.device)
+        cdf = torch.cumsum(self.counts, dim=-1)
+        target = q * cdf[..., -1:]
+        bucket = torch.searchsorted(cdf.contiguous(), target.contiguous()).clamp_(max=self.num_buckets - 1)
+        below = torch.gather(cdf, -1, bucket) - torch.gather(self.counts, -1, bucket)
+        frac = ((target - below) / torch.gather(self.counts, -1, bucket).clamp(min=1e-9)).clamp_(0.0, 1.0)
+        lo, hi = self.edges[bucket], self.edges[bucket + 1]
+        return lo + frac * (hi - lo)
+
+
+TERRAIN_QUANTILES = (0.5, 0.9, 0.99)
+TERRAIN_METRICS = (
+    "lin_err_mae", "ang_err_mae", "success_rate",
+    "lin_err_p50", "lin_err_p90", "lin_err_p99",
+    "ang_err_p50", "ang_err_p90", "ang_err_p99",
+)
+
+
+def terrain_stats(env, env_ids, window=500, tb_root="terrain", flush_interval=10, quantile_decay=0.995):
     """
     Collects and logs terrain-wise tracking errors and success rates.
 
+    Statistics are reduced per integer terrain id with bincount and scatter ops into
+    device-side ring buffers, and handed to a `TensorBoardSink` without leaving the device.
+
     Args:
         env (ManagerBasedRLEnv): The simulation environment.
         env_ids (List[int]): List of environment indices to evaluate.
         window (int): Smoothing window size for moving averages.
         tb_root (str): TensorBoard log root group name.
+        flush_interval (int): Number of calls averaged into one TensorBoard point.
+        quantile_decay (float): Per-call fading of the quantile sketches, one keeps all history.
     """
-    run_dir = Path(getattr(env, "run_dir", ".")) 
-    log_dir = run_dir / "logs" / "tracking"
-    log_dir.mkdir(parents=True, exist_ok=True)
-
     # Initialize logging cache if not already present
     if not hasattr(env, "TERRAIN_ERR_CACHE"):
-        terr_names = active_terrain_names(env)
-        uniq = sorted(set(terr_names))
+        run_dir = Path(getattr(env, "run_dir", "."))
+        log_dir = run_dir / "logs" / "tracking"
+        log_dir.mkdir(parents=True, exist_ok=True)
+
+        names = list(env.scene.terrain.cfg.terrain_generator.sub_terrains.keys())
+        num_terrains = len(names)
+        tags = [f"{tb_root}/{terr}/{metric}" for terr in names for metric in TERRAIN_METRICS]
         env.TERRAIN_ERR_CACHE = {
             "step":   0,
-            "writer": SummaryWriter(log_dir=str(log_dir)),
-            "lin":  {t: collections.deque(maxlen=window) for t in uniq},
-            "ang":  {t: collections.deque(maxlen=window) for t in uniq},
-            "succ": collections.Counter(),
-            "trials": collections.Counter(),
+            "writer": TensorBoardSink(str(log_dir), tags, env.device, flush_interval=flush_interval),
+            "names":  names,
+            # Ring buffers of [lin_err, ang_err], with a scratch row for overwritten samples
+            "errors": torch.zeros(num_terrains + 1, window, 2, device=env.device),
+            "samples": torch.zeros(num_terrains, dtype=torch.long, device=env.device),
+            "succ":   torch.zeros(num_terrains, device=env.device),
+            "trials": torch.zeros(num_terrains, device=env.device),
+            "quantiles": HistogramQuantiles(num_terrains, 2, env.device, decay=quantile_decay),
         }
 
     C = env.TERRAIN_ERR_CACHE
-    step, writer = C["step"], C["writer"]
+    step, writer, names = C["step"], C["writer"], C["names"]
+    num_terrains = len(names)
 
     if not isinstance(env.obs_buf, dict) or "policy" not in env.obs_buf:
         return {}
@@ -87,39 +158,143 @@ def terrain_stats(env, env_ids, window=500, tb_root="terrain"):
     v_cmd, w_cmd = obs[env_ids, 9], obs[env_ids, 11]
     v_err, w_err = torch.abs(v_cmd - v_act), torch.abs(w_cmd - w_act)
 
+    ids = env_terrain_ids(env, env_ids)
+    counts = torch.bincount(ids, minlength=num_terrains)
+    ring_write(C["errors"], C["samples"], ids, counts, torch.stack([v_err, w_err], dim=1))
+    C["quantiles"].update(ids, torch.stack([v_err, w_err], dim=1))
+
+    # Episodes that ended this step count as trials, and time-outs as successes
+    done = env.termination_manager.dones[env_ids].float()
+    time_out = env.termination_manager.time_outs[env_ids].float()
+    C["trials"] += torch.bincount(ids, weights=done, minlength=num_terrains)
+    C["succ"] += torch.bincount(ids, weights=time_out, minlength=num_terrains)
+
+    # Mean over the filled part of each ring buffer
+    filled = C["samples"].clamp(max=window)
+    mae = C["errors"][:num_terrains].sum(dim=1) / filled.clamp(min=1)[:, None]
+    succ = C["succ"] / C["trials"].clamp(min=1)
+
+    # Log stats to TensorBoard, one row of TERRAIN_METRICS per terrain
+    quantiles = C["quantiles"].quantiles(TERRAIN_QUANTILES).flatten(1)
+    stats = torch.cat([mae, succ[:, None], quantiles], dim=1)
+    valid = (filled > 0)[:, None].expand_as(stats)
+    writer.add(stats.flatten(), step, valid.flatten())
+
+    C["step"] += 1
+
+
+ENERGY_METRICS = ("power", "cot", "torque_saturation")
+
+
+def energy_stats(env, env_ids, tb_root="energy", flush_interval=10, save_interval=100):
+    """
+    Collects and logs mechanical power, cost of transport and torque saturation.
+
+    All three metrics are computed for every env in one batched pass:
+        power = sum_j |tau_j * qd_j|
+        cot = power / (m * g * max(|v_xy|, 0.1))
+        torque_saturation = fraction of joints whose computed torque was clipped by the actuator.
+
+    They are reduced per terrain id, and logged through a `TensorBoardSink`. Once the grid
+    curriculum exists, they are also accumulated per curriculum command bin, using the bins
+    cached by the command term, and the bin means are saved to `energy_bins.npz` every
+    `save_interval` calls (see `scripts/eval/heatmap_energy_bins.py`).
+
+    Args:
+        env (ManagerBasedRLEnv): The simulation environment.
+        env_ids (List[int]): List of environment indices to evaluate.
+        tb_root (str): TensorBoard log root group name.
+        flush_interval (int): Number of calls averaged into one TensorBoard point.
+        save_interval (int): Number of calls between two saves of the command bin means.
+    """
+    # Plane terrains have no sub-terrains to report on
+    if env.scene.terrain.cfg.terrain_generator is None:
+        return
+
     robot = env.scene["robot"]
-    torques = robot.data.applied_torque[env_ids]
-    qd = robot.data.joint_vel[env_ids]
-    # power = torch.sum(torch.abs(torques * qd), dim=1)
-
-    # mass, g = robot.data.mass, 9.81
-    lin_vel = obs[env_ids, 0]
-    # cot = power / ((mass * g) * torch.clamp(torch.abs(lin_vel), min=1e-3))
-
-    terr_names = active_terrain_names(env)
-    for li, eid in enumerate(env_ids):
-        terr = terr_names[eid]
-
-        C["lin"][terr].append(v_err[li].item())
-        C["ang"][terr].append(w_err[li].item())
-        # C["cot"][terr].append(cot[li].item())
-
-        if env.termination_manager.terminated[eid]:
-            C["trials"][terr] += 1
-            if env.termination_manager.time_outs[eid]:
-                C["succ"][terr] += 1
-
-    # Log stats to TensorBoard
-    for terr in C["lin"]:
-        if C["lin"][terr]:
-            writer.add_scalar(f"{tb_root}/{terr}/lin_err_mae",
-                              np.mean(C["lin"][terr]), step)
-            writer.add_scalar(f"{tb_root}/{terr}/ang_err_mae",
-                              np.mean(C["ang"][terr]), step)
-            # writer.add_scalar(f"{tb_root}/{terr}/cot",
-            #                   np.mean(C["cot"][terr]), step)
-            succ = C["succ"][terr] / max(C["trials"][terr], 1)
-            writer.add_scalar(f"{tb_root}/{terr}/success_rate",
-                              succ, step)
+
+    # Initialize logging cache if not already present
+    if not hasattr(env, "ENERGY_CACHE"):
+        run_dir = Path(getattr(env, "run_dir", "."))
+        log_dir = run_dir / "logs" / "energy"
+        log_dir.mkdir(parents=True, exist_ok=True)
+
+        names = list(env.scene.terrain.cfg.terrain_generator.sub_terrains.keys())
+        tags = [f"{tb_root}/{terr}/{metric}" for terr in names for metric in ENERGY_METRICS]
+        env.ENERGY_CACHE = {
+            "step":   0,
+            "writer": TensorBoardSink(str(log_dir), tags, env.device, flush_interval=flush_interval),
+            "names":  names,
+            "bins_path": log_dir / "energy_bins.npz",
+            # Total mass per env, read once after the startup mass randomization
+            "mass":   robot.root_physx_view.get_masses().sum(dim=1).to(env.device),
+            # Allocated on the first call after the grid curriculum is created
+            "bin_sums":   None,
+            "bin_counts": None,
+        }
+
+    C = env.ENERGY_CACHE
+    num_terrains = len(C["names"])
+
+    # Per-env metrics in one pass
+    applied = robot.data.applied_torque[env_ids]
+    power = torch.sum(torch.abs(applied * robot.data.joint_vel[env_ids]), dim=1)
+    speed = torch.norm(robot.data.root_lin_vel_b[env_ids, :2], dim=1).clamp(min=0.1)
+    cot = power / (C["mass"][env_ids] * 9.81 * speed)
+    saturation = (torch.abs(robot.data.computed_torque[env_ids] - applied) > 1e-4).float().mean(dim=1)
+    metrics = torch.stack([power, cot, saturation], dim=1)
+
+    # Per-terrain means of this call
+    ids = env_terrain_ids(env, env_ids)
+    counts = torch.bincount(ids, minlength=num_terrains)
+    sums = torch.zeros(num_terrains, len(ENERGY_METRICS), device=env.device).index_add_(0, ids, metrics)
+    means = sums / counts.clamp(min=1)[:, None]
+    valid = (counts > 0)[:, None].expand_as(means)
+    C["writer"].add(means.flatten(), C["step"], valid.flatten())
+
+    # Running totals per curriculum command bin
+    manager = curriculum.grid_curriculum
+    if manager is not None:
+        num_bins = manager.num_lin * manager.num_ang
+        if C["bin_sums"] is None:
+            C["bin_sums"] = torch.zeros(num_bins, len(ENERGY_METRICS), device=env.device)
+            C["bin_counts"] = torch.zeros(num_bins, device=env.device)
+
+        cmd_term = env.command_manager.get_term("base_velocity")
+        if hasattr(cmd_term, "bin_indices"):
+            bin_idx = cmd_term.bin_indices(env_ids)
+        else:
+            cmds = env.command_manager.get_command("base_velocity")[env_ids][:, [0, 2]]
+            bin_idx = manager.map_commands_to_bin_indices(cmds)
+        C["bin_sums"].index_add_(0, bin_idx, metrics)
+        C["bin_counts"] += torch.bincount(bin_idx, minlength=num_bins)
+
+        if (C["step"] + 1) % save_interval == 0:
+            np.savez(
+                C["bins_path"],
+                step=C["step"],
+                lin_vals=manager.lin_vals.cpu().numpy(),
+                ang_vals=manager.ang_vals.cpu().numpy(),
+                metrics=np.array(ENERGY_METRICS),
+                means=energy_bin_means(env).cpu().numpy(),
+                counts=C["bin_counts"].view(manager.num_lin, manager.num_ang).cpu().numpy(),
+            )
 
     C["step"] += 1
+
+
+def energy_bin_means(env):
+    """
+    Returns the mean energy metrics of every curriculum command bin collected by `energy_stats`.
+
+    Args:
+        env (ManagerBasedRLEnv): The simulation environment.
+
+    Returns:
+        torch.Tensor: [power, cot, torque_saturation] per bin (num_lin, num_ang, 3), NaN for
+        bins never visited.
+    """
+    C = env.ENERGY_CACHE
+    manager = curriculum.grid_curriculum
+    means = C["bin_sums"] / C["bin_counts"][:, None]
+    return means.view(manager.num_lin, manager.num_ang, len(ENERGY_METRICS))